@@ -0,0 +1,65 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+"""
+Compares scheduling with and without lookahead on random blocks of gates, reporting
+the number of moments and the time taken by :func:`jaqalpaq.scheduler.schedule_circuit`
+either way. Run it from the repository root, e.g. ::
+
+    python benchmarks/bench_lookahead.py --gates 10000 --qubits 4 8 20 --window 256
+
+Requires the QSCOUT gate models to be installed.
+"""
+import argparse
+import time
+
+from jaqalpaq.core.circuitbuilder import build
+from jaqalpaq.scheduler import schedule_circuit
+from qscout.v1.std.jaqal_gates import ALL_GATES as native_gates
+
+from bench_scheduler import random_block_sexpr
+
+
+def count_moments(circuit, **kwargs):
+    """Schedules circuit, returning how many moments its block took and how long that
+    took to work out."""
+    start = time.perf_counter()
+    scheduled = schedule_circuit(circuit, **kwargs)
+    elapsed = time.perf_counter() - start
+    return len(scheduled.body.statements[0].statements), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--gates", type=int, default=10000)
+    parser.add_argument("--qubits", type=int, nargs="+", default=[4, 8, 20])
+    parser.add_argument("--ms-density", type=float, default=0.1)
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument(
+        "--window", type=int, help="How far to look ahead; unlimited if not given"
+    )
+    parser.add_argument("--time-budget", type=float)
+    args = parser.parse_args()
+
+    lookahead = True if args.window is None else args.window
+    print("qubits seed  greedy lookahead  saved  greedy(s) lookahead(s)")
+    for qubits in args.qubits:
+        for seed in range(args.seeds):
+            circuit = build(
+                random_block_sexpr(args.gates, qubits, args.ms_density, seed),
+                native_gates,
+            )
+            greedy, greedy_time = count_moments(circuit)
+            better, better_time = count_moments(
+                circuit, lookahead=lookahead, time_budget=args.time_budget
+            )
+            print(
+                f"{qubits:6} {seed:4} {greedy:7} {better:9} "
+                f"{1 - better / greedy:6.1%} {greedy_time:10.3f} {better_time:12.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
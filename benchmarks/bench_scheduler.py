@@ -0,0 +1,92 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+"""
+Times :func:`jaqalpaq.scheduler.schedule_circuit` on a single large unscheduled block of
+randomized-benchmarking-style gates. Run it from the repository root, e.g. ::
+
+    python benchmarks/bench_scheduler.py --gates 50000 --qubits 20
+
+Requires the QSCOUT gate models to be installed.
+"""
+import argparse
+import random
+import time
+
+from jaqalpaq.core.circuitbuilder import build
+from jaqalpaq.scheduler import schedule_circuit
+from qscout.v1.std.jaqal_gates import ALL_GATES as native_gates
+
+SINGLE_QUBIT_GATES = ["Px", "Py", "Pz", "Sx", "Sy", "Sz", "Sxd", "Syd", "Szd"]
+
+
+def qubit(idx):
+    """Returns the S-expression for the qubit at idx in the register q."""
+    return ("array_item", "q", idx)
+
+
+def random_gate(rng, qubits, ms_density):
+    """
+    Returns the S-expression for a random gate: an MS gate between two distinct qubits
+    with probability ms_density, and otherwise one of :data:`SINGLE_QUBIT_GATES`.
+
+    :param random.Random rng: The random number generator to draw the gate from.
+    :param int qubits: How many qubits the circuit has.
+    :param float ms_density: The fraction of gates that should be MS gates.
+    :rtype: tuple
+    """
+    if qubits > 1 and rng.random() < ms_density:
+        a, b = rng.sample(range(qubits), 2)
+        return ("gate", "MS", qubit(a), qubit(b), 0.0, rng.uniform(-3.14, 3.14))
+    return ("gate", rng.choice(SINGLE_QUBIT_GATES), qubit(rng.randrange(qubits)))
+
+
+def random_block_sexpr(gates, qubits, ms_density=0.1, seed=0):
+    """
+    Builds the S-expression for a circuit containing one unscheduled block, bracketed by
+    prepare_all and measure_all, of random single-qubit gates and MS gates.
+
+    :param int gates: How many gates to put in the block.
+    :param int qubits: How many qubits the circuit has.
+    :param float ms_density: The fraction of gates that should be MS gates.
+    :param int seed: The random seed to generate the circuit with.
+    :returns: The S-expression, suitable for passing to
+        :func:`jaqalpaq.core.circuitbuilder.build`.
+    :rtype: tuple
+    """
+    rng = random.Random(seed)
+    body = [("gate", "prepare_all")]
+    body.extend(random_gate(rng, qubits, ms_density) for _ in range(gates))
+    body.append(("gate", "measure_all"))
+    return ("circuit", ("register", "q", qubits), ("unscheduled_block", *body))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--gates", type=int, default=50000)
+    parser.add_argument("--qubits", type=int, default=20)
+    parser.add_argument("--ms-density", type=float, default=0.1)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    circuit = build(
+        random_block_sexpr(args.gates, args.qubits, args.ms_density, args.seed),
+        native_gates,
+    )
+    times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        scheduled = schedule_circuit(circuit)
+        times.append(time.perf_counter() - start)
+    print(
+        f"{args.gates} gates on {args.qubits} qubits: "
+        f"{len(scheduled.body.statements[0].statements)} moments, "
+        f"best of {args.repeat}: {min(times):.3f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+"""
+Measures :func:`jaqalpaq.scheduler.schedule_circuit` across block sizes, qubit counts,
+MS densities, and circuit shapes, and writes the results as JSON. Run it from the
+repository root, e.g. ::
+
+    python benchmarks/bench_suite.py --output results.json
+    python benchmarks/bench_suite.py --quick --baseline results.json
+
+Each case is a circuit with one unscheduled block of random gates: "flat" blocks hold
+only gates, "loops" blocks also hold short loops, and "macros" blocks also call macros,
+which are scheduled with `macros=True`. For each case the suite records the best wall
+time of several runs, the peak memory allocated while scheduling as reported by
+:mod:`tracemalloc`, and the counts from a :class:`jaqalpaq.scheduler.SchedulerStats`,
+including the number of moments produced.
+
+Given a baseline written by an earlier run, cases are matched by name, and any case
+that got slower (if it takes at least 10ms) or used more memory by more than the
+tolerance, or produced more moments, is reported; the exit status is 1 if there were
+any.
+
+Requires the QSCOUT gate models to be installed.
+"""
+import argparse
+import itertools
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from jaqalpaq.core.circuitbuilder import build
+from jaqalpaq.scheduler import schedule_circuit, SchedulerStats
+from qscout.v1.std.jaqal_gates import ALL_GATES as native_gates
+
+from bench_scheduler import qubit, random_block_sexpr, random_gate
+
+SHAPES = ("flat", "loops", "macros")
+
+# Macros called from "macros" blocks: a single-qubit macro whose body can share a moment,
+# and an entangling one that needs several.
+_MACROS = [
+    ("macro", "Flip", "a", ("sequential_block", ("gate", "Px", "a"))),
+    (
+        "macro",
+        "Entangle",
+        "a",
+        "b",
+        (
+            "sequential_block",
+            ("gate", "Sy", "a"),
+            ("gate", "MS", "a", "b", 0.0, 1.5707963267948966),
+            ("gate", "Syd", "a"),
+        ),
+    ),
+]
+
+
+def shaped_block_sexpr(shape, gates, qubits, ms_density=0.1, seed=0):
+    """
+    Builds the S-expression for a circuit containing one unscheduled block of about the
+    given number of gates, in one of the :data:`SHAPES`.
+
+    :param str shape: Which kind of block to build.
+    :param int gates: How many gates to put in the block, counting each loop body once.
+    :param int qubits: How many qubits the circuit has.
+    :param float ms_density: The fraction of gates that should be MS gates.
+    :param int seed: The random seed to generate the circuit with.
+    :returns: The S-expression, suitable for passing to
+        :func:`jaqalpaq.core.circuitbuilder.build`.
+    :rtype: tuple
+    """
+    if shape == "flat":
+        return random_block_sexpr(gates, qubits, ms_density, seed)
+    rng = random.Random(seed)
+    body = [("gate", "prepare_all")]
+    count = 0
+    while count < gates:
+        choice = rng.random()
+        if shape == "loops" and choice < 0.02:
+            # A loop of a few iterations over a short sequence of gates.
+            length = rng.randrange(1, 6)
+            sub_gates = [random_gate(rng, qubits, ms_density) for _ in range(length)]
+            body.append(
+                ("loop", rng.randrange(2, 10), ("sequential_block", *sub_gates))
+            )
+            count += length
+        elif shape == "macros" and choice < 0.2:
+            if qubits > 1 and rng.random() < ms_density:
+                a, b = rng.sample(range(qubits), 2)
+                body.append(("gate", "Entangle", qubit(a), qubit(b)))
+            else:
+                body.append(("gate", "Flip", qubit(rng.randrange(qubits))))
+            count += 1
+        else:
+            body.append(random_gate(rng, qubits, ms_density))
+            count += 1
+    body.append(("gate", "measure_all"))
+    macros = _MACROS if shape == "macros" else []
+    return (
+        "circuit",
+        ("register", "q", qubits),
+        *macros,
+        ("unscheduled_block", *body),
+    )
+
+
+def run_case(shape, gates, qubits, ms_density, repeat, seed=0):
+    """
+    Schedules one generated circuit, returning a dict describing the case and what was
+    measured.
+    """
+    circuit = build(
+        shaped_block_sexpr(shape, gates, qubits, ms_density, seed), native_gates
+    )
+    options = {"macros": True} if shape == "macros" else {}
+
+    times = []
+    for _ in range(repeat):
+        stats = SchedulerStats()
+        start = time.perf_counter()
+        schedule_circuit(circuit, stats=stats, **options)
+        times.append(time.perf_counter() - start)
+
+    # Tracing allocations slows scheduling down, so memory is measured separately.
+    tracemalloc.start()
+    try:
+        schedule_circuit(circuit, **options)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "name": f"{shape}-{gates}-{qubits}q-ms{ms_density:g}",
+        "shape": shape,
+        "gates": gates,
+        "qubits": qubits,
+        "ms_density": ms_density,
+        "seed": seed,
+        "time": min(times),
+        "peak_memory": peak,
+        "stats": stats.as_dict(),
+    }
+
+
+def environment():
+    """Describes where the suite ran, so results from different machines or versions
+    aren't mistaken for a regression."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    try:
+        from importlib.metadata import version
+
+        jaqalpaq_version = version("JaqalPaq")
+    except Exception:
+        # Older Pythons don't have importlib.metadata.
+        jaqalpaq_version = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "jaqalpaq": jaqalpaq_version,
+        "commit": commit,
+    }
+
+
+def compare(results, baseline, tolerance, min_time=0.01):
+    """
+    Prints how each case in results changed from the same case in baseline, and returns
+    the names of those that regressed. Cases that take less than min_time seconds are
+    too noisy to count as slower.
+    """
+    before = {case["name"]: case for case in baseline["results"]}
+    regressed = []
+    for case in results:
+        old = before.get(case["name"])
+        if old is None:
+            continue
+        time_ratio = case["time"] / old["time"] if old["time"] else 1.0
+        memory_ratio = (
+            case["peak_memory"] / old["peak_memory"] if old["peak_memory"] else 1.0
+        )
+        moments = case["stats"]["moments"] - old["stats"]["moments"]
+        worse = (
+            (time_ratio > 1 + tolerance and case["time"] >= min_time)
+            or memory_ratio > 1 + tolerance
+            or moments > 0
+        )
+        if worse:
+            regressed.append(case["name"])
+        print(
+            f"{case['name']:32} time x{time_ratio:5.2f}  memory x{memory_ratio:5.2f}  "
+            f"moments {moments:+d}{'  REGRESSED' if worse else ''}"
+        )
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000, 1000000]
+    )
+    parser.add_argument("--qubits", type=int, nargs="+", default=[2, 8, 64])
+    parser.add_argument("--ms-density", type=float, nargs="+", default=[0.05, 0.3])
+    parser.add_argument("--shapes", nargs="+", choices=SHAPES, default=list(SHAPES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--quick",
+        action="store_true",
+        help="Skip blocks of more than 10000 gates",
+    )
+    parser.add_argument("--output", help="Where to write the results as JSON")
+    parser.add_argument("--baseline", help="Results of an earlier run to compare with")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="How much slower or larger a case may get before it's reported",
+    )
+    args = parser.parse_args()
+
+    sizes = args.sizes
+    if args.quick:
+        sizes = [size for size in sizes if size <= 10000]
+
+    results = []
+    for shape, gates, qubits, ms_density in itertools.product(
+        args.shapes, sizes, args.qubits, args.ms_density
+    ):
+        case = run_case(shape, gates, qubits, ms_density, args.repeat)
+        results.append(case)
+        print(
+            f"{case['name']:32} {case['time']:9.3f}s "
+            f"{case['peak_memory'] / 2**20:9.1f}MiB "
+            f"{case['stats']['moments']:9} moments",
+            flush=True,
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
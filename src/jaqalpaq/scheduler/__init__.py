@@ -1,6 +1,24 @@
 # Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
 # Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
 # certain rights in this software.
-from .scheduler import schedule_circuit
+from .cache import ScheduleCache
+from .compact import compact_schedule
+from .constraints import ConstraintTable
+from .durations import circuit_duration
+from .estimate import ScheduleEstimate, estimate_schedule
+from .scheduler import schedule_circuit, schedule_circuits
+from .stats import SchedulerStats
+from .stream import schedule_stream
 
-__all__ = ["schedule_circuit"]
+__all__ = [
+    "ConstraintTable",
+    "ScheduleCache",
+    "ScheduleEstimate",
+    "SchedulerStats",
+    "circuit_duration",
+    "compact_schedule",
+    "estimate_schedule",
+    "schedule_circuit",
+    "schedule_circuits",
+    "schedule_stream",
+]
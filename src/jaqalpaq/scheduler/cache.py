@@ -0,0 +1,68 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+from collections import OrderedDict
+from threading import Lock
+
+
+class ScheduleCache:
+    """
+    Remembers how unscheduled blocks were scheduled, so that a block with the same
+    structure as one seen before can be scheduled by replaying the earlier result instead
+    of placing every gate again. Pass one to :func:`schedule_circuit` as `cache` and reuse
+    it across calls, e.g. for every circuit in a parameter sweep.
+
+    Blocks are keyed by :meth:`SchedulerContext.structure_key`: for each instruction in
+    order, the kind of statement it is, the qubits it acts on, which operations its gate
+    may share a moment with, its load against any limits, and its duration and axes when
+    those are used, followed by the options that shape the schedule, such as
+    `lookahead`, `time_budget`, and the limits. Angles themselves are left out only
+    because no supported mode reads them except through the axes and durations already
+    in the key; a mode that does must add what it reads. When the cache is full, the
+    entry that was used least recently is discarded.
+
+    A cache may be shared between threads, and between circuits with different registers
+    or native gates; it only stores moment assignments, never statements.
+
+    :param int maxsize: The most blocks to remember, or None for no limit.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        #: How many lookups found a schedule to replay.
+        self.hits = 0
+        #: How many lookups had to schedule the block from scratch.
+        self.misses = 0
+        self._plans = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._plans)
+
+    def get(self, key):
+        """Returns the plan stored for key, or None, counting a hit or miss."""
+        with self._lock:
+            try:
+                plan = self._plans[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._plans.move_to_end(key)
+            self.hits += 1
+            return plan
+
+    def put(self, key, plan):
+        """Stores the plan for key, discarding the least recently used entry if the
+        cache is full."""
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            if self.maxsize is not None and len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+
+    def clear(self):
+        """Discards every stored plan and resets the counters."""
+        with self._lock:
+            self._plans.clear()
+            self.hits = 0
+            self.misses = 0
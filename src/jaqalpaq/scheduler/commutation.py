@@ -0,0 +1,67 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+from math import pi
+
+from jaqalpaq.error import JaqalError
+
+#: The axis of gates that are diagonal in the computational basis. Every other axis is
+#: an angle in [0, pi) in the X-Y plane, measured from the X axis.
+Z_AXIS = -1.0
+
+
+def normalize_axis(angle):
+    """
+    Returns the axis in the X-Y plane at angle from the X axis, in the form used by
+    :data:`QSCOUT_AXES`. Opposite directions are the same axis, and angles are rounded
+    slightly, so equivalent axes computed different ways compare equal.
+
+    :param float angle: The angle of the axis, in radians.
+    :rtype: float
+    """
+    axis = round(angle % pi, 12)
+    if axis >= round(pi, 12):
+        axis = 0.0
+    return axis
+
+
+#: For each QSCOUT native gate that's a rotation generated by the same Pauli-like
+#: operator on every qubit it acts on, the axis of that operator: either a fixed axis,
+#: or the name of the parameter giving its angle in the X-Y plane. Two such gates
+#: commute if they have the same axis on every qubit they share.
+QSCOUT_AXES = {
+    "R": "axis-angle",
+    "Rx": normalize_axis(0),
+    "Ry": normalize_axis(pi / 2),
+    "Rz": Z_AXIS,
+    "Px": normalize_axis(0),
+    "Py": normalize_axis(pi / 2),
+    "Pz": Z_AXIS,
+    "Sx": normalize_axis(0),
+    "Sy": normalize_axis(pi / 2),
+    "Sz": Z_AXIS,
+    "Sxd": normalize_axis(0),
+    "Syd": normalize_axis(pi / 2),
+    "Szd": Z_AXIS,
+    "MS": "axis-angle",
+    "Sxx": normalize_axis(0),
+}
+
+
+def gate_axis(gate, axes=QSCOUT_AXES):
+    """
+    Returns the axis a gate acts along on each of its qubits, or None if it isn't known
+    to commute with anything.
+
+    :param GateStatement gate: The gate to look up.
+    :param dict axes: The table to look it up in, in the form of :data:`QSCOUT_AXES`.
+    :rtype: float or None
+    """
+    axis = axes.get(gate.name)
+    if not isinstance(axis, str):
+        return axis
+    try:
+        return normalize_axis(float(gate.parameters_by_name[axis]))
+    except (KeyError, TypeError, ValueError, JaqalError):
+        # The angle isn't known, e.g. because it's a macro parameter.
+        return None
@@ -0,0 +1,128 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+from jaqalpaq.core import BlockStatement, LoopStatement, Circuit
+from jaqalpaq.core.block import UnscheduledBlockStatement
+from jaqalpaq.core.algorithm.visitor import Visitor
+
+from .scheduler import SchedulerContext, _Moment
+
+
+def compact_schedule(circ, constraints=None):
+    """
+    Shortens a circuit that's already been scheduled, such as one produced by a frontend
+    that emits a parallel block for each moment of its input, by merging adjacent moments
+    that could have been one. Within every sequential block, each gate or parallel block
+    is merged into the moment before it if the two act on disjoint qubits and the same
+    restrictions :func:`schedule_circuit` follows allow them to share a moment; a run of
+    several such statements becomes a single parallel block.
+
+    Nothing is reordered, and only adjacent statements are merged, so the result is
+    found in a single pass. Loops and nested sequential blocks are compacted internally,
+    but never merged with the statements around them. Unscheduled blocks and macro
+    definitions are left as they are.
+
+    :param Circuit circ: The circuit to compact.
+    :param constraints: The rules for which operations may share a moment. Defaults to
+        the QSCOUT rules for the circuit's native gates.
+    :type constraints: ConstraintTable or None
+    :returns: The compacted circuit. This may share some data with the original circuit,
+        which should not be modified.
+    :rtype: Circuit
+    """
+
+    return CompactVisitor(constraints).visit(circ)
+
+
+class CompactVisitor(Visitor):
+    """
+    Rebuilds a circuit with adjacent compatible moments merged; see
+    :func:`compact_schedule`.
+
+    :param constraints: The rules for which operations may share a moment.
+    :type constraints: ConstraintTable or None
+    """
+
+    def __init__(self, constraints=None):
+        super().__init__()
+        self.constraints = constraints
+
+    def visit_default(self, obj, context=None):
+        return obj
+
+    def visit_Circuit(self, circ):
+        context = SchedulerContext(
+            circ.fundamental_registers(),
+            circ.native_gates,
+            circ.body,
+            constraints=self.constraints,
+        )
+        new_circuit = Circuit(native_gates=circ.native_gates)
+        new_circuit.constants.update(circ.constants)
+        new_circuit.registers.update(circ.registers)
+        new_circuit.macros.update(circ.macros)
+        new_circuit.body.statements.extend(self.visit(circ.body, context).statements)
+        return new_circuit
+
+    def visit_BlockStatement(self, block, context):
+        if isinstance(block, UnscheduledBlockStatement):
+            return block
+        if block.parallel:
+            return BlockStatement(
+                statements=[
+                    self.visit(instr, context)
+                    if isinstance(instr, (BlockStatement, LoopStatement))
+                    else instr
+                    for instr in block
+                ],
+                parallel=True,
+            )
+        new_statements = []
+        # The moment being built, and the statement it started with, which is kept as it
+        # is if nothing else joins it.
+        moment = None
+        first = None
+        for instr in block:
+            if isinstance(instr, (BlockStatement, LoopStatement)):
+                instr = self.visit(instr, context)
+            if isinstance(instr, LoopStatement) or (
+                isinstance(instr, BlockStatement) and not instr.parallel
+            ):
+                footprint = None
+            else:
+                footprint = context.get_footprint(instr)
+                if moment is not None and context.can_parallelize(moment, footprint):
+                    moment.add(instr, footprint, len(moment.units))
+                    continue
+            if moment is not None:
+                new_statements.append(_close(moment, first))
+                moment = None
+            if footprint is None:
+                new_statements.append(instr)
+                continue
+            first = instr
+            if isinstance(instr, BlockStatement):
+                statements = list(instr.statements)
+            else:
+                statements = [instr]
+            moment = _Moment(
+                statements,
+                footprint.mask,
+                footprint.classes,
+                footprint.accepts,
+                [0],
+                footprint.load,
+            )
+        if moment is not None:
+            new_statements.append(_close(moment, first))
+        return BlockStatement(statements=new_statements)
+
+    def visit_LoopStatement(self, loop, context):
+        return LoopStatement(loop.iterations, self.visit(loop.statements, context))
+
+
+def _close(moment, first):
+    """Returns the statement carrying out moment, which started with first."""
+    if len(moment.units) == 1 or not moment.statements:
+        return first
+    return moment.statement()
@@ -0,0 +1,173 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+from collections import OrderedDict
+from threading import Lock
+
+from jaqalpaq.error import JaqalError
+
+#: The class of gates that can't occur in parallel with any other operation.
+EXCLUSIVE = 0
+#: The class of single-qubit gates, which can occur in parallel with each other.
+PARALLEL = 1
+#: The class of gates, like prepare_all and measure_all, that act on every qubit at once.
+BARRIER = 2
+
+#: The pairs of gate classes that the QSCOUT hardware can execute simultaneously on
+#: disjoint qubits.
+QSCOUT_COMPATIBLE = frozenset([(PARALLEL, PARALLEL)])
+
+
+def classify_gate(gate_def):
+    """
+    Returns the class of a native gate under the current QSCOUT restrictions.
+
+    :param gate_def: The definition of the gate.
+    :type gate_def: jaqalpaq.core.AbstractGate
+    :returns: One of :data:`EXCLUSIVE`, :data:`PARALLEL`, or :data:`BARRIER`.
+    :rtype: int
+    """
+    if any(param is all for param in gate_def.used_qubits):
+        return BARRIER  # Can't prepare or measure in parallel with anything.
+    if len(gate_def.quantum_parameters) > 1:
+        return EXCLUSIVE  # Can't do multiple 2-qubit gates at once.
+    return PARALLEL
+
+
+class ConstraintTable:
+    """
+    The rules deciding which operations may share a moment, compiled for one set of
+    native gates. Each gate name is mapped to an integer class, and each class to a
+    bitmask of the classes it may share a moment with, so that checking a pair of
+    operations is a dictionary lookup and a bitwise AND. No qubit can be involved in two
+    simultaneous operations regardless of these rules.
+
+    Anything that isn't a native gate, such as a macro or a loop, is :data:`EXCLUSIVE`,
+    since it could contain anything. Describing different hardware means passing a
+    different `classify` function, `compatible` set, or both.
+
+    Hardware with a fixed number of channels to drive operations with can also limit how
+    many operations share a moment, either of a particular class or in total. The number
+    of operations a moment holds against every limit is packed into the fields of a
+    single int, called its load, so that checking whether two loads fit together is an
+    addition and a bitwise AND.
+
+    :param dict native_gates: The native gates to compile the rules for.
+    :param classify: A function mapping a gate definition to its class, a small
+        non-negative int.
+    :param compatible: The pairs of classes that may share a moment; each pair is
+        compatible in either order.
+    :type compatible: iterable(tuple(int, int))
+    :param limits: If given, maps a class, or None for every class, to the most
+        operations of it that may share a moment. An operation that exceeds a limit on
+        its own, such as a parallel block with too many gates, gets a moment to itself.
+    :type limits: dict or None
+    :raises JaqalError: If a limit is less than 1.
+    """
+
+    __slots__ = ("classes", "accepts", "limits", "usage", "headroom", "overflow")
+
+    def __init__(
+        self,
+        native_gates,
+        classify=classify_gate,
+        compatible=QSCOUT_COMPATIBLE,
+        limits=None,
+    ):
+        #: Maps the name of every native gate to its class.
+        self.classes = {
+            name: classify(gate_def) for name, gate_def in native_gates.items()
+        }
+        class_count = max([EXCLUSIVE, *self.classes.values()]) + 1
+        for first, second in compatible:
+            class_count = max(class_count, first + 1, second + 1)
+        limits = limits or {}
+        for gate_class in limits:
+            if gate_class is not None:
+                class_count = max(class_count, gate_class + 1)
+        #: For each class, the bitmask of classes it may share a moment with.
+        self.accepts = [0] * class_count
+        for first, second in compatible:
+            self.accepts[first] |= 1 << second
+            self.accepts[second] |= 1 << first
+
+        # Each limit gets a field wide enough that, as long as the loads being added each
+        # fit within it, their sum can't carry into the next field. The headroom brings
+        # each field's limit up to just below its top bit, so the sum exceeds a limit
+        # exactly when the top bit of its field is set.
+        masks = []
+        for gate_class, limit in limits.items():
+            if limit < 1:
+                raise JaqalError(f"Can't limit operations per moment to {limit}")
+            if gate_class is None:
+                masks.append(((1 << class_count) - 1, limit))
+            else:
+                masks.append((1 << gate_class, limit))
+        #: The limits, as pairs of the bitmask of classes they count and the most
+        #: operations of those classes that may share a moment.
+        self.limits = tuple(sorted(masks))
+        width = max([limit for _, limit in self.limits], default=0).bit_length() + 1
+        #: For each class, the load of a single operation of it.
+        self.usage = [0] * class_count
+        #: What to add to the sum of two loads so that any field over its limit has its
+        #: top bit set.
+        self.headroom = 0
+        #: The top bit of every field.
+        self.overflow = 0
+        for idx, (mask, limit) in enumerate(self.limits):
+            shift = idx * width
+            for gate_class in range(len(self.usage)):
+                if mask & (1 << gate_class):
+                    self.usage[gate_class] |= 1 << shift
+            self.headroom |= ((1 << (width - 1)) - 1 - limit) << shift
+            self.overflow |= 1 << (shift + width - 1)
+
+    def gate_class(self, name):
+        """Returns the class of the gate called name."""
+        return self.classes.get(name, EXCLUSIVE)
+
+    def fits(self, first, second):
+        """Whether operations with the loads first and second may share a moment without
+        exceeding any limit."""
+        return not (first + second + self.headroom) & self.overflow
+
+    def full(self, load, accepts):
+        """Whether a moment with the given load can't take any more operations of the
+        classes it accepts."""
+        return all(
+            not self.fits(load, usage)
+            for gate_class, usage in enumerate(self.usage)
+            if accepts & (1 << gate_class)
+        )
+
+
+# The tables compiled so far, least recently used first. Each is keyed by the name and
+# identity of every gate definition it was compiled for: circuits each get their own copy
+# of the native gates dict, but share the definitions in it.
+_tables = OrderedDict()
+_tables_lock = Lock()
+_MAX_TABLES = 16
+
+
+def constraint_table(native_gates):
+    """
+    Returns the :class:`ConstraintTable` for native_gates under the QSCOUT rules,
+    compiling it only the first time it's asked for a set of gate definitions.
+
+    :param dict native_gates: The native gates to compile the rules for.
+    :rtype: ConstraintTable
+    """
+    key = frozenset((name, id(gate_def)) for name, gate_def in native_gates.items())
+    with _tables_lock:
+        entry = _tables.get(key)
+        if entry is not None:
+            _tables.move_to_end(key)
+            return entry[1]
+    table = ConstraintTable(native_gates)
+    with _tables_lock:
+        # The definitions are kept alongside their table so their ids can't be reused
+        # while it's here.
+        _tables[key] = (tuple(native_gates.values()), table)
+        if len(_tables) > _MAX_TABLES:
+            _tables.popitem(last=False)
+    return table
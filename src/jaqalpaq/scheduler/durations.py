@@ -0,0 +1,57 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+from jaqalpaq.core import BlockStatement, LoopStatement, GateStatement, Macro
+from jaqalpaq.error import JaqalError
+
+
+def statement_duration(instr, durations):
+    """
+    Estimates how long a statement takes to execute. Statements in a parallel block
+    take as long as the longest of them, statements in a sequential block take as long
+    as all of them together, and a loop takes as long as its body times the number of
+    iterations.
+
+    :param instr: The statement to estimate.
+    :param dict durations: Maps gate names to their durations. Each duration is either
+        a number, or a function that takes the :class:`jaqalpaq.core.GateStatement` and
+        returns a number, e.g. to depend on its angle. A macro that isn't listed takes
+        as long as its body.
+    :returns: The estimated duration, in whatever units durations uses.
+    :raises JaqalError: If a gate's duration isn't given.
+    """
+    if isinstance(instr, GateStatement):
+        model = durations.get(instr.name)
+        if model is None:
+            if isinstance(instr.gate_def, Macro):
+                return statement_duration(instr.gate_def.body, durations)
+            raise JaqalError(f"No duration given for gate {instr.name}")
+        if callable(model):
+            return model(instr)
+        return model
+    elif isinstance(instr, BlockStatement):
+        total = 0
+        for sub_instr in instr:
+            duration = statement_duration(sub_instr, durations)
+            if not instr.parallel:
+                total += duration
+            elif duration > total:
+                total = duration
+        return total
+    elif isinstance(instr, LoopStatement):
+        return int(instr.iterations) * statement_duration(instr.statements, durations)
+    else:
+        raise JaqalError("Can't estimate duration of %s." % str(instr))
+
+
+def circuit_duration(circ, durations):
+    """
+    Estimates how long a circuit takes to execute once, e.g. after scheduling it with
+    :func:`schedule_circuit`.
+
+    :param Circuit circ: The circuit to estimate.
+    :param dict durations: The durations of its gates; see :func:`statement_duration`.
+    :returns: The estimated duration, in whatever units durations uses.
+    :raises JaqalError: If the duration of a gate in the circuit isn't given.
+    """
+    return statement_duration(circ.body, durations)
@@ -0,0 +1,207 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+from collections import Counter
+from itertools import islice
+
+from jaqalpaq.core import BlockStatement, LoopStatement, GateStatement, Macro
+from jaqalpaq.core.block import UnscheduledBlockStatement
+from jaqalpaq.error import JaqalError
+
+from .durations import statement_duration
+from .scheduler import SchedulerContext, _units, _plan_duration
+
+
+def estimate_schedule(circ, durations=None, constraints=None):
+    """
+    Estimates what :func:`schedule_circuit` would produce for a circuit, without building
+    the scheduled circuit. Each unscheduled block is placed exactly as the scheduler
+    would place it, but only the resulting moment assignments are kept, so this takes
+    time and memory linear in the size of the circuit.
+
+    Everything is counted as the circuit would execute once, so a loop counts its body
+    once for every iteration, and a call to a macro counts the macro's body.
+
+    :param Circuit circ: The circuit to estimate.
+    :param durations: If given, maps gate names to how long they take, both to schedule
+        for duration as :func:`schedule_circuit` would, and to estimate how long the
+        result takes; see :func:`statement_duration`.
+    :type durations: dict or None
+    :param constraints: The rules for which operations may share a moment. Defaults to
+        the QSCOUT rules for the circuit's native gates.
+    :type constraints: ConstraintTable or None
+    :returns: The estimate.
+    :rtype: ScheduleEstimate
+    :raises JaqalError: If `durations` is given, but the duration of a gate in the
+        circuit isn't.
+    """
+    context = SchedulerContext(
+        circ.fundamental_registers(),
+        circ.native_gates,
+        circ.body,
+        constraints=constraints,
+        durations=durations,
+    )
+    estimate = ScheduleEstimate()
+    moments, path, duration = _estimate(circ.body, context, estimate.gate_counts, 1)
+    estimate.moments = moments
+    estimate.critical_path = path
+    estimate.duration = duration
+    return estimate
+
+
+class ScheduleEstimate:
+    """
+    What scheduling a circuit would produce, as returned by :func:`estimate_schedule`.
+    """
+
+    __slots__ = ("moments", "critical_path", "duration", "gate_counts")
+
+    def __init__(self):
+        #: How many moments the scheduled circuit executes.
+        self.moments = 0
+        #: The most moments any chain of operations that must happen one after another
+        #: takes, which no schedule can improve on. Parts of the circuit that are already
+        #: scheduled count as they are.
+        self.critical_path = 0
+        #: How long the scheduled circuit takes to execute, if durations were given.
+        self.duration = None
+        #: How many times each gate is executed, by name; e.g. ``gate_counts["MS"]``.
+        self.gate_counts = Counter()
+
+    def __repr__(self):
+        return (
+            f"ScheduleEstimate(moments={self.moments}, "
+            f"critical_path={self.critical_path}, duration={self.duration}, "
+            f"gate_counts={dict(self.gate_counts)})"
+        )
+
+
+def _estimate(instr, context, gate_counts, iterations, reschedule=True):
+    """
+    Returns the number of moments, the critical path, and the duration (or None) of
+    instr once scheduled, adding the gates in it, executed iterations times, to
+    gate_counts. Unscheduled blocks are estimated as the scheduler would reschedule
+    them only if reschedule is true; otherwise they're left as they are, as they are in
+    the operations the scheduler places.
+    """
+    durations = context.durations
+    if isinstance(instr, GateStatement):
+        if isinstance(instr.gate_def, Macro):
+            return _estimate_macro(instr, context, gate_counts, iterations)
+        gate_counts[instr.name] += iterations
+        duration = None if durations is None else statement_duration(instr, durations)
+        return 1, 1, duration
+    elif isinstance(instr, UnscheduledBlockStatement) and reschedule:
+        return _estimate_unscheduled(instr, context, gate_counts, iterations)
+    elif isinstance(instr, BlockStatement):
+        moments = path = 0
+        duration = None if durations is None else 0
+        for sub_instr in instr:
+            sub_moments, sub_path, sub_duration = _estimate(
+                sub_instr, context, gate_counts, iterations, reschedule
+            )
+            if instr.parallel:
+                moments = max(moments, sub_moments)
+                path = max(path, sub_path)
+                if durations is not None:
+                    duration = max(duration, sub_duration)
+            else:
+                moments += sub_moments
+                path += sub_path
+                if durations is not None:
+                    duration += sub_duration
+        return moments, path, duration
+    elif isinstance(instr, LoopStatement):
+        count = int(instr.iterations)
+        moments, path, duration = _estimate(
+            instr.statements, context, gate_counts, iterations * count, reschedule
+        )
+        return (
+            moments * count,
+            path * count,
+            None if duration is None else duration * count,
+        )
+    else:
+        raise JaqalError("Can't estimate %s." % str(instr))
+
+
+def _estimate_macro(call, context, gate_counts, iterations):
+    """Does the work of :func:`_estimate` for a call to a macro, which executes the
+    macro's body, as scheduled if the scheduler schedules macro bodies."""
+    macro = call.gate_def
+    summary = context.get_macro(macro) if context.macros else None
+    body = macro.body if summary is None else summary.definition.body
+    moments, path, duration = _estimate(
+        body, context, gate_counts, iterations, reschedule=False
+    )
+    if context.durations is not None and call.name in context.durations:
+        duration = statement_duration(call, context.durations)
+    return moments, path, duration
+
+
+def _estimate_unscheduled(block, context, gate_counts, iterations):
+    """Does the work of :func:`_estimate` for an unscheduled block, by planning it the
+    way the scheduler would and following each qubit's latest operation."""
+    statements = context.inline_macros(block)
+    plan = context.plan(statements)
+    units = list(_units(statements))
+    footprints = [context.get_footprint(unit) for unit in units]
+
+    # Most units are gates, which take one moment and are counted directly; anything
+    # else is estimated as a whole, and the plan says how the units overlap.
+    sizes = {}
+    paths = [1] * len(units)
+    names = Counter()
+    for idx, unit in enumerate(units):
+        if type(unit) is GateStatement and not isinstance(unit.gate_def, Macro):
+            names[unit.name] += 1
+        else:
+            # The scheduler places each of these as it is, rescheduling nothing in it.
+            sizes[idx], paths[idx], _ = _estimate(
+                unit, context, gate_counts, iterations, reschedule=False
+            )
+    for name, count in names.items():
+        gate_counts[name] += count * iterations
+
+    # Whether each unit has to follow the one before it, as part of a sequential block.
+    chained = []
+    for instr in statements:
+        if isinstance(instr, BlockStatement) and not instr.parallel:
+            chained.append(False)
+            chained.extend(True for _ in islice(_units([instr]), 1, None))
+        else:
+            chained.append(False)
+
+    # Every operation follows the latest one on each of its qubits, just as when
+    # scheduling.
+    finished = [0] * context.qubit_count
+    path = 0
+    previous = 0
+    for footprint, unit_path, follows in zip(footprints, paths, chained):
+        qubits = footprint.qubits
+        start = previous if follows and qubits else 0
+        for qubit in qubits:
+            if finished[qubit] > start:
+                start = finished[qubit]
+        previous = start + unit_path
+        for qubit in qubits:
+            finished[qubit] = previous
+        if previous > path:
+            path = previous
+
+    if sizes:
+        moments = 0
+        for moment in plan:
+            moments += max(
+                sizes.get(unit if unit >= 0 else ~unit, 1) for unit in moment
+            )
+    else:
+        moments = len(plan)
+    if context.durations is None:
+        duration = None
+    else:
+        duration = _plan_duration(
+            plan, [footprint.duration for footprint in footprints]
+        )
+    return moments, path, duration
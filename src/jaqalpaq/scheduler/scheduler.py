@@ -1,20 +1,44 @@
 # Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
 # Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
 # certain rights in this software.
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice, repeat
+from time import perf_counter
+
 from jaqalpaq.core import (
     BlockStatement,
     LoopStatement,
     GateStatement,
     ParamType,
     Circuit,
+    Macro,
+    NamedQubit,
+    Parameter,
 )
 from jaqalpaq.core.block import UnscheduledBlockStatement
+from jaqalpaq.core.algorithm.expand_macros import GateReplacer
 from jaqalpaq.core.algorithm.visitor import Visitor
 from jaqalpaq.core.algorithm.used_qubit_visitor import UsedQubitIndicesVisitor
 from jaqalpaq.error import JaqalError
 
+from .constraints import EXCLUSIVE, constraint_table
+from .commutation import QSCOUT_AXES, gate_axis
+from .durations import statement_duration
+from .stats import SchedulerStats
+
 
-def schedule_circuit(circ):
+def schedule_circuit(
+    circ,
+    workers=None,
+    cache=None,
+    constraints=None,
+    durations=None,
+    commute=False,
+    macros=False,
+    lookahead=None,
+    time_budget=None,
+    stats=None,
+):
     """
     Takes every :class:`jaqalpaq.core.BlockStatement` that has been flagged unscheduled,
     and replaces it with a block that is functionally identical (contains the same gates,
@@ -27,164 +51,1474 @@ def schedule_circuit(circ):
     * Two-qubit gates cannot occur in parallel with any other operation.
     * State preparation and measurement cannot occur in parallel with any other operation.
     * No qubit can be involved in multiple simultaneous gates.
-    * Macro-defined gates cannot occur in parallel with any other operation.
+    * Macro-defined gates cannot occur in parallel with any other operation, unless
+      `macros` is given.
     * Loop statements cannot occur in parallel with any other operation.
 
     These restrictions are not enforced by Jaqal itself, and other submodules may generate
     code that does not comply with them if instructed to by the user, but they will not
     execute on the current version of the QSCOUT hardware, and so this scheduler does not
-    introduce them.
+    introduce them. All but the restriction on qubits are described by a
+    :class:`ConstraintTable`, and a different one may be passed as `constraints` to
+    schedule for hardware with different rules.
 
     Additionally, sequential blocks cannot be nested directly in other sequential blocks;
     when the process of scheduling creates such a nesting, it will automatically replace
     the inner block with every gate it contains.
 
+    Separate unscheduled blocks never interact, and within a block every prepare_all and
+    measure_all is a barrier no other gate can be moved across. If `workers` is given,
+    each block is split at those barriers, and the resulting segments are scheduled
+    concurrently in that many worker processes. The result is the same as scheduling
+    serially, except that a gate acting on no qubits can't be moved earlier than the
+    last barrier before it, and that if `durations` or `commute` is given, the choice
+    between schedules described below is made separately for each segment. For small
+    circuits, the cost of starting the worker processes and sending the segments to them
+    will outweigh any gain.
+
+    If `cache` is given, each unscheduled block is first looked up in it, and a block
+    with the same structure as one scheduled before (the same gates on the same qubits,
+    regardless of their classical arguments) is scheduled the same way, without redoing
+    the placement. Blocks that aren't found are scheduled as usual and added to it.
+
+    If `durations` is given, each block is also scheduled to minimize how long it takes
+    rather than how many moments it has, assuming each moment takes as long as the
+    longest operation in it. Operations are placed one moment at a time, always starting
+    with whichever of the operations that are ready is followed by the longest chain of
+    dependent operations, and adding any other ready operations that fit. Each block
+    keeps whichever of that schedule and the usual one is estimated to be shorter; use
+    :func:`circuit_duration` to estimate the duration of the result. The restrictions
+    above apply either way.
+
+    If `commute` is true, gates that are known to commute may also be reordered: a gate
+    only has to follow the earlier gates on its qubits that it doesn't commute with,
+    rather than all of them. Each gate is a rotation along some axis on every qubit it
+    acts on (Z for Rz, Pz, Sz and Szd, or an axis in the X-Y plane for the others and
+    MS), and two gates commute if they have the same axis on every qubit they share.
+    Other gates, macros, blocks, and loops are assumed not to commute with anything.
+    Each block keeps whichever of that schedule and the usual one has fewer moments, or
+    is estimated to be shorter if `durations` is given.
+
+    If `macros` is true, the body of every macro is scheduled once, in the same way, and
+    calls to it are placed according to the result. A call to a macro whose body is a
+    single moment may share a moment with anything the contents of that moment could. A
+    call to a macro whose body is a single unscheduled block taking several moments, some
+    of which could be shared, is replaced by the contents of that block, which are then
+    scheduled along with the block the call was in, so that other operations can fill
+    the gaps in it. Calls to any other macro still get a moment to themselves. The macros
+    of the result are defined by their scheduled bodies.
+
+    If `lookahead` is given, each block is also list-scheduled: operations are placed
+    one moment at a time, always starting with whichever of the operations that are
+    ready heads the longest chain of dependent operations, and adding any other ready
+    operations that fit. Unlike the usual placement, this can hold a gate back from a
+    moment it would share with little else so that it fills a later one instead, such
+    as one that would otherwise be left next to a two-qubit gate. If `lookahead` is a
+    number, only operations fewer than that many places after the earliest one not yet
+    placed are considered, which keeps the result closer to program order but rarely
+    improves on the usual schedule unless it's large compared to the number of qubits.
+    Each block keeps whichever of that schedule and the usual one has fewer moments, or
+    is estimated to be shorter if `durations` is given, so the result is never worse. If
+    `time_budget` is given, list-scheduling a block that takes longer than that many
+    seconds is abandoned in favor of the usual schedule.
+
     :param Circuit circ: The circuit to parallelize.
+    :param workers: If given, the number of worker processes to schedule with.
+    :type workers: int or None
+    :param cache: If given, a cache of previous schedules to reuse and add to.
+    :type cache: ScheduleCache or None
+    :param constraints: The rules for which operations may share a moment. Defaults to
+        the QSCOUT rules for the circuit's native gates.
+    :type constraints: ConstraintTable or None
+    :param durations: If given, maps gate names to how long they take; see
+        :func:`statement_duration`. If `workers` is also given, any functions in it must
+        be picklable.
+    :type durations: dict or None
+    :param commute: Whether to reorder commuting gates. May also be a table of gate
+        axes in the form of :data:`QSCOUT_AXES`, for other native gates.
+    :type commute: bool or dict
+    :param bool macros: Whether to schedule macro bodies and parallelize calls to them.
+    :param lookahead: Whether to also list-schedule each block, or how many
+        operations ahead to look when doing so.
+    :type lookahead: bool or int or None
+    :param time_budget: If given, how many seconds to spend list-scheduling each block.
+    :type time_budget: float or None
+    :param stats: If given, counts what was done and how long it took.
+    :type stats: SchedulerStats or None
     :returns: The rescheduled circuit. This may share some data with the original circuit,
         which should not be modified.
     """
 
-    visitor = SchedulerVisitor()
-    return visitor.visit(circ)
+    visitor = SchedulerVisitor(
+        cache=cache,
+        stats=stats,
+        constraints=constraints,
+        durations=durations,
+        commute=commute,
+        macros=macros,
+        lookahead=lookahead,
+        time_budget=time_budget,
+    )
+    prescheduled = None
+    if workers is not None:
+        prescheduled = {}
+        context = SchedulerContext(
+            circ.fundamental_registers(),
+            circ.native_gates,
+            circ.body,
+            **visitor.options,
+        )
+        blocks = []
+        segments = []
+        keys = []
+        for block in _find_unscheduled_blocks(circ.body):
+            statements = context.inline_macros(block)
+            if cache is not None:
+                key = context.structure_key(statements)
+                plan = cache.get(key)
+                if plan is not None:
+                    prescheduled[id(block)] = plan
+                    continue
+                keys.append(key)
+            blocks.append(block)
+            segments.append(statements)
+        plans = _schedule_segments(
+            segments,
+            circ.fundamental_registers(),
+            circ.native_gates,
+            workers,
+            visitor.options,
+        )
+        for block, plan in zip(blocks, plans):
+            prescheduled[id(block)] = plan
+        for key, plan in zip(keys, plans):
+            cache.put(key, plan)
+    return visitor.visit(circ, prescheduled)
+
+
+def schedule_circuits(
+    circuits,
+    workers=None,
+    executor="thread",
+    chunksize=1,
+    cache=None,
+    constraints=None,
+    durations=None,
+    commute=False,
+    macros=False,
+    lookahead=None,
+    time_budget=None,
+    stats=None,
+):
+    """
+    Schedules every circuit in circuits, as :func:`schedule_circuit` would.
+
+    If `workers` is given, the circuits are divided into chunks of `chunksize` and
+    scheduled concurrently by that many workers. With the "thread" executor they share
+    one :class:`SchedulerVisitor` and any `cache`; with the "process" executor each
+    worker schedules the blocks it's sent and returns only the resulting moment
+    assignments, which are applied to the original circuits in this process, and the
+    `cache` is consulted and updated only in this process. Processes don't contend for
+    the interpreter, but every circuit has to be sent to one, so a larger `chunksize`
+    amortizes that cost over many small circuits.
+
+    :param circuits: The circuits to parallelize.
+    :type circuits: iterable(Circuit)
+    :param workers: If given, the number of workers to schedule with.
+    :type workers: int or None
+    :param str executor: Either "thread" or "process".
+    :param int chunksize: How many circuits to give a worker at a time.
+    :param cache: If given, a cache of previous schedules to reuse and add to.
+    :type cache: ScheduleCache or None
+    :param constraints: The rules for which operations may share a moment. Defaults to
+        the QSCOUT rules for each circuit's native gates.
+    :type constraints: ConstraintTable or None
+    :param durations: If given, maps gate names to how long they take, to schedule for
+        duration as described in :func:`schedule_circuit`. With the "process" executor,
+        any functions in it must be picklable.
+    :type durations: dict or None
+    :param commute: Whether to reorder commuting gates, as described in
+        :func:`schedule_circuit`.
+    :type commute: bool or dict
+    :param bool macros: Whether to schedule macro bodies and parallelize calls to them,
+        as described in :func:`schedule_circuit`.
+    :param lookahead: Whether to also list-schedule each block, or how many
+        operations ahead to look when doing so, as described in
+        :func:`schedule_circuit`.
+    :type lookahead: bool or int or None
+    :param time_budget: If given, how many seconds to spend list-scheduling each block.
+    :type time_budget: float or None
+    :param stats: If given, counts what was done and how long it took.
+    :type stats: SchedulerStats or None
+    :returns: The rescheduled circuits, in the same order.
+    :rtype: list(Circuit)
+    :raises JaqalError: If the executor isn't recognized.
+    """
+
+    circuits = list(circuits)
+    visitor = SchedulerVisitor(
+        cache=cache,
+        stats=stats,
+        constraints=constraints,
+        durations=durations,
+        commute=commute,
+        macros=macros,
+        lookahead=lookahead,
+        time_budget=time_budget,
+    )
+    if workers is None:
+        return [visitor.visit(circ) for circ in circuits]
+
+    if executor == "thread":
+        chunks = [
+            circuits[start : start + chunksize]
+            for start in range(0, len(circuits), chunksize)
+        ]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return [
+                scheduled
+                for result in pool.map(
+                    lambda chunk: [visitor.visit(circ) for circ in chunk], chunks
+                )
+                for scheduled in result
+            ]
+    elif executor != "process":
+        raise JaqalError(f"Unknown executor {executor}")
+
+    # Work out which blocks actually need scheduling, and only send the circuits that
+    # contain them.
+    prescheduled = [{} for _ in circuits]
+    pending = []
+    misses = []
+    for idx, circ in enumerate(circuits):
+        blocks = list(_find_unscheduled_blocks(circ.body))
+        if cache is None:
+            if blocks:
+                pending.append(idx)
+            continue
+        context = SchedulerContext(
+            circ.fundamental_registers(),
+            circ.native_gates,
+            circ.body,
+            **visitor.options,
+        )
+        for block in blocks:
+            key = context.structure_key(context.inline_macros(block))
+            plan = cache.get(key)
+            if plan is None:
+                misses.append((idx, block, key))
+            else:
+                prescheduled[idx][id(block)] = plan
+        if misses and misses[-1][0] == idx:
+            pending.append(idx)
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(
+                _plan_circuit,
+                [circuits[idx] for idx in pending],
+                repeat(visitor.options, len(pending)),
+                chunksize=chunksize,
+            )
+            for idx, plans in zip(pending, results):
+                blocks = _find_unscheduled_blocks(circuits[idx].body)
+                for block, plan in zip(blocks, plans):
+                    prescheduled[idx][id(block)] = plan
+    for idx, block, key in misses:
+        cache.put(key, prescheduled[idx][id(block)])
+
+    return [visitor.visit(circ, plans) for circ, plans in zip(circuits, prescheduled)]
 
 
 class SchedulerVisitor(Visitor):
-    def visit_default(self, obj):
-        return obj
+    """
+    Rebuilds a circuit with its unscheduled blocks scheduled. Everything specific to the
+    circuit being visited is kept in a :class:`SchedulerContext` created for each call,
+    so one visitor may schedule several circuits at once from different threads. Blocks
+    and loops with nothing in them to reschedule are shared with the original circuit
+    rather than copied.
 
-    def visit_Circuit(self, circ):
-        self.all_qubits = {}
-        for reg in circ.fundamental_registers():
-            self.all_qubits[reg.name] = set(range(reg.size))
+    :param cache: If given, a cache of previous schedules to reuse and add to.
+    :type cache: ScheduleCache or None
+    :param stats: If given, counts what was done and how long it took.
+    :type stats: SchedulerStats or None
+    :param options: Keyword arguments to pass to every :class:`SchedulerContext`.
+    """
+
+    def __init__(self, cache=None, stats=None, **options):
+        super().__init__()
+        self.cache = cache
+        self.stats = stats
+        self.options = options
 
-        self.native_gates = circ.native_gates
-        self.body = circ.body
+    def visit_default(self, obj, context=None):
+        return obj
+
+    def visit_Circuit(self, circ, prescheduled=None):
+        context = SchedulerContext(
+            circ.fundamental_registers(),
+            circ.native_gates,
+            circ.body,
+            prescheduled,
+            stats=None if self.stats is None else SchedulerStats(),
+            **self.options,
+        )
+        context.pending = set()
+        _find_pending(circ.body, context.body, context.macros, context.pending)
         new_circuit = Circuit(native_gates=circ.native_gates)
         new_circuit.constants.update(circ.constants)
         new_circuit.registers.update(circ.registers)
-        new_circuit.macros.update(circ.macros)
-        new_circuit.body.statements.extend(self.visit(circ.body).statements)
+        if context.macros:
+            for name, macro in circ.macros.items():
+                summary = context.get_macro(macro)
+                new_circuit.macros[name] = summary.definition if summary else macro
+        else:
+            new_circuit.macros.update(circ.macros)
+        new_circuit.body.statements.extend(self.visit(circ.body, context).statements)
+        if self.stats is not None:
+            self.stats.add(context.stats)
         return new_circuit
 
-    def visit_BlockStatement(self, block):
+    def visit_BlockStatement(self, block, context):
+        if context.pending is not None and id(block) not in context.pending:
+            # Nothing in it would change, so it can be shared with the original.
+            return block
         new_statements = []
         if isinstance(block, UnscheduledBlockStatement):
-            used_qubits = _get_used_qubit_indices(block, self.all_qubits)
-            freeze_timestamps = {
-                regname: {idx: -1 for idx in used_qubits[regname]}
-                for regname in used_qubits
-            }
-            for instr in block:
-                self.schedule_instr(instr, new_statements, freeze_timestamps)
-            for moment in range(len(new_statements)):
-                if isinstance(new_statements[moment], list):
-                    if len(new_statements[moment]) > 1:
-                        new_statements[moment] = BlockStatement(
-                            statements=new_statements[moment], parallel=True
-                        )
-                    else:
-                        new_statements[moment] = new_statements[moment][0]
+            stats = context.stats
+            if stats is None:
+                scheduled = self.schedule_block(block, context)
+            else:
+                start = perf_counter()
+                footprint_time = stats.footprint_time
+                scheduled = self.schedule_block(block, context)
+                elapsed = perf_counter() - start
+                stats.record_block(
+                    scheduled, elapsed - (stats.footprint_time - footprint_time)
+                )
+            if context.macros:
+                scheduled = [context.rebind(instr) for instr in scheduled]
+            new_statements.extend(scheduled)
         elif block.parallel:
             for instr in block:
                 if isinstance(instr, BlockStatement) or isinstance(
                     instr, LoopStatement
                 ):
-                    new_statements.append(self.visit(instr))
+                    new_statements.append(self.visit(instr, context))
                 else:
-                    new_statements.append(instr)
+                    new_statements.append(context.rebind(instr))
         else:
             for instr in block:
                 if isinstance(instr, BlockStatement):
-                    if instr.parallel or block is self.body:
-                        new_statements.append(self.visit(instr))
+                    if instr.parallel or block is context.body:
+                        new_statements.append(self.visit(instr, context))
                     else:
-                        new_statements.extend(self.visit(instr).statements)
+                        new_statements.extend(self.visit(instr, context).statements)
                 elif isinstance(instr, LoopStatement):
-                    new_statements.append(self.visit(instr))
+                    new_statements.append(self.visit(instr, context))
                 else:
-                    new_statements.append(instr)
+                    new_statements.append(context.rebind(instr))
         return BlockStatement(statements=new_statements, parallel=block.parallel)
 
-    def visit_LoopStatement(self, loop):
-        return LoopStatement(loop.iterations, self.visit(loop.statements))
+    def visit_LoopStatement(self, loop, context):
+        if context.pending is not None and id(loop) not in context.pending:
+            return loop
+        return LoopStatement(loop.iterations, self.visit(loop.statements, context))
+
+    def schedule_block(self, block, context):
+        """Schedules an unscheduled block, reusing an existing plan for it if there is
+        one, and returns one statement for each moment."""
+        statements = context.inline_macros(block)
+        plan = context.prescheduled.get(id(block))
+        if plan is None and self.cache is not None:
+            key = context.structure_key(statements)
+            plan = self.cache.get(key)
+            if plan is None:
+                plan = context.plan(statements)
+                self.cache.put(key, plan)
+        elif plan is None:
+            if (
+                context.durations is None
+                and context.commute is None
+                and context.lookahead is None
+            ):
+                return context.schedule_statements(statements)
+            plan = context.plan(statements)
+        return _apply_plan(statements, plan)
+
+
+class SchedulerContext:
+    """
+    The state needed to schedule statements acting on one set of registers with one set
+    of native gates, and the scheduling algorithm itself.
+
+    :param registers: The fundamental registers of the circuit being scheduled.
+    :type registers: list(jaqalpaq.core.Register)
+    :param dict native_gates: The native gates of the circuit being scheduled.
+    :param body: The body of the circuit being scheduled, if any.
+    :type body: BlockStatement or None
+    :param prescheduled: Maps the ids of unscheduled blocks that have already been
+        scheduled elsewhere to the plans they should be scheduled with.
+    :type prescheduled: dict or None
+    :param constraints: The rules for which operations may share a moment. Defaults to
+        the QSCOUT rules for native_gates.
+    :type constraints: ConstraintTable or None
+    :param durations: If given, maps gate names to how long they take, to schedule for
+        duration rather than moment count; see :func:`statement_duration`.
+    :type durations: dict or None
+    :param commute: Whether to also try reordering commuting gates, or a table of gate
+        axes in the form of :data:`QSCOUT_AXES`.
+    :type commute: bool or dict
+    :param bool macros: Whether to schedule macro bodies and parallelize calls to them.
+    :param lookahead: Whether to also list-schedule each block, or how many
+        operations ahead to look when doing so.
+    :type lookahead: bool or int or None
+    :param time_budget: If given, how many seconds to spend list-scheduling each block.
+    :type time_budget: float or None
+    :param parameters: If scheduling the body of a macro, its parameters, any of which
+        may be used as a qubit.
+    :type parameters: list(Parameter) or None
+    :param stats: If given, counts what was done and how long it took.
+    :type stats: SchedulerStats or None
+    """
+
+    def __init__(
+        self,
+        registers,
+        native_gates,
+        body=None,
+        prescheduled=None,
+        constraints=None,
+        durations=None,
+        commute=False,
+        macros=False,
+        lookahead=None,
+        time_budget=None,
+        parameters=None,
+        stats=None,
+    ):
+        self.registers = registers
+        self.all_qubits = {}
+        # Every fundamental qubit gets a dense integer id, so that the set of qubits an
+        # instruction or moment touches can be packed into a single int bitmask, and
+        # per-qubit state can be kept in a flat list.
+        self.qubit_offsets = {}
+        offset = 0
+        for reg in registers:
+            self.all_qubits[reg.name] = set(range(reg.size))
+            self.qubit_offsets[reg.name] = offset
+            offset += reg.size
+        # The parameters of a macro whose body is being scheduled get ids of their own.
+        self.parameter_offsets = {}
+        for param in parameters or ():
+            self.parameter_offsets[param.name] = offset
+            offset += 1
+        self.qubit_count = offset
+
+        self.native_gates = native_gates
+        if constraints is None:
+            constraints = constraint_table(native_gates)
+        self.constraints = constraints
+        self.durations = durations
+        if commute is True:
+            commute = QSCOUT_AXES
+        self.commute = commute or None
+        self.macros = macros
+        if not isinstance(lookahead, (bool, type(None))) and lookahead < 1:
+            raise JaqalError(f"Can't look ahead {lookahead} operations")
+        self.lookahead = lookahead or None
+        self.time_budget = time_budget
+        self.stats = stats
+        self.body = body
+        # If known, the ids of every block and loop in body that the scheduler has to
+        # rebuild; see _find_pending. Anything else is shared with the original.
+        self.pending = None
+        self.prescheduled = prescheduled or {}
+        # An instruction's footprint is needed again every time a later instruction
+        # probes the moment it was placed in, so remember it for the duration of this call.
+        self.footprint_cache = {}
+        # Maps the ids of macros to what's known about them once scheduled, in the same
+        # way as the footprint cache.
+        self.macro_cache = {}
+
+    def structure_key(self, statements):
+        """
+        Returns a hashable summary of statements that determines how they're scheduled:
+        for each instruction the scheduler places, what kind of statement it is, the
+        qubits it acts on, which operations it may share a moment with, its load against
+        any limits on moments, how long it takes if scheduling for duration, and its axis
+        on each qubit if reordering commuting gates, with sequential blocks nested as
+        tuples of their own, followed by the options that choose how they're placed and
+        the limits if there are any.
+        """
+        key = []
+        for instr in statements:
+            if isinstance(instr, BlockStatement) and not instr.parallel:
+                key.append(self.structure_key(instr))
+            else:
+                footprint = self.get_footprint(instr)
+                key.append(
+                    (
+                        type(instr).__name__,
+                        footprint.qubits,
+                        footprint.classes,
+                        footprint.accepts,
+                        footprint.load,
+                        footprint.duration,
+                        footprint.axes,
+                    )
+                )
+        # Greedy and list-scheduled plans differ for the same statements.
+        key.append(
+            (
+                self.lookahead,
+                self.time_budget,
+                self.durations is not None,
+                self.commute is not None,
+                bool(self.macros),
+            )
+        )
+        if self.constraints.limits:
+            # Loads are only meaningful alongside the limits they were packed for.
+            key.append(self.constraints.limits)
+        return tuple(key)
+
+    def plan(self, statements):
+        """Schedules the contents of an unscheduled block, returning the plan, as
+        returned by :meth:`_Schedule.plan`."""
+        # Each alternative is only kept if it's strictly better than the usual schedule.
+        plans = [self.greedy_plan(statements)]
+        if self.commute is not None:
+            plans.append(self.schedule_moments(statements, commute=True).plan())
+        units = None
+        if self.lookahead is not None:
+            units = list(_units(statements))
+            deadline = None
+            if self.time_budget is not None:
+                deadline = perf_counter() + self.time_budget
+            window = None if self.lookahead is True else self.lookahead
+            plan = self.critical_path_plan(
+                units, statements, [1] * len(units), window, deadline
+            )
+            if plan is not None:
+                plans.append(plan)
+        if self.durations is None:
+            return min(plans, key=len)
+        if units is None:
+            units = list(_units(statements))
+        durations = [self.get_footprint(unit).duration for unit in units]
+        plans.append(self.critical_path_plan(units, statements, durations))
+        return min(plans, key=lambda plan: _plan_duration(plan, durations))
+
+    def critical_path_plan(
+        self, units, statements, weights, window=None, deadline=None
+    ):
+        """
+        List-schedules units, the result of :func:`_units` on statements, prioritizing
+        each by the longest total weight of any chain of operations that starts with it,
+        and returns the plan. If window is given, only units fewer than that many places
+        after the first one not yet placed are considered. If deadline is given, returns
+        None instead once :func:`time.perf_counter` passes it.
+        """
+        # Work out what each unit has to follow: the last unit to act on each of its
+        # qubits, and the unit before it in any sequential block it's part of, in the
+        # same way schedule_instr requires.
+        count = len(units)
+        successors = [[] for _ in range(count)]
+        predecessors = [0] * count
+        footprints = [self.get_footprint(unit) for unit in units]
+        last_user = [-1] * self.qubit_count
+        idx = 0
+        for instr in statements:
+            chained = isinstance(instr, BlockStatement) and not instr.parallel
+            end = idx + (sum(1 for _ in _units([instr])) if chained else 1)
+            for unit in range(idx, end):
+                qubits = footprints[unit].qubits
+                required = {last_user[qubit] for qubit in qubits}
+                if chained and qubits and unit > idx:
+                    required.add(unit - 1)
+                required.discard(-1)
+                for earlier in required:
+                    successors[earlier].append(unit)
+                predecessors[unit] = len(required)
+                for qubit in qubits:
+                    last_user[qubit] = unit
+            idx = end
+
+        priority = [0] * count
+        for unit in reversed(range(count)):
+            priority[unit] = weights[unit] + max(
+                (priority[later] for later in successors[unit]), default=0
+            )
+
+        plan = []
+        ready = [unit for unit in range(count) if not predecessors[unit]]
+        # Every unit before frontier has been placed. Since units only ever follow
+        # earlier ones, the unit at frontier is always ready.
+        frontier = 0
+        done = [False] * count
+        while ready:
+            if deadline is not None and perf_counter() > deadline:
+                return None
+            if window is None:
+                candidates = ready
+            else:
+                candidates = [unit for unit in ready if unit < frontier + window]
+            # Between equally urgent units, place one that needs a moment to itself
+            # first, so the others can still share a moment with whatever follows it.
+            candidates.sort(
+                key=lambda unit: (-priority[unit], bool(footprints[unit].accepts), unit)
+            )
+            first = candidates[0]
+            footprint = footprints[first]
+            moment = [first]
+            # As in schedule_instr, a block or loop that starts a moment keeps it.
+            if footprint.accepts and not isinstance(
+                units[first], (BlockStatement, LoopStatement)
+            ):
+                constraints = self.constraints
+                mask = footprint.mask
+                accepts = footprint.accepts
+                load = footprint.load
+                for unit in candidates[1:]:
+                    footprint = footprints[unit]
+                    if isinstance(units[unit], LoopStatement) or (
+                        mask & footprint.mask
+                        or footprint.classes & ~accepts
+                        or not constraints.fits(load, footprint.load)
+                    ):
+                        continue
+                    moment.append(
+                        ~unit if isinstance(units[unit], BlockStatement) else unit
+                    )
+                    mask |= footprint.mask
+                    accepts &= footprint.accepts
+                    load += footprint.load
+                if self.stats is not None:
+                    self.stats.record_scan(len(candidates) - 1, 0)
+            plan.append(moment)
+            for unit in moment:
+                done[unit if unit >= 0 else ~unit] = True
+            ready = [unit for unit in ready if not done[unit]]
+            for unit in moment:
+                for later in successors[unit if unit >= 0 else ~unit]:
+                    predecessors[later] -= 1
+                    if not predecessors[later]:
+                        ready.append(later)
+            while frontier < count and done[frontier]:
+                frontier += 1
+        return plan
+
+    def schedule_statements(self, statements):
+        """Schedules the contents of an unscheduled block, returning one statement for
+        each moment."""
+        if self.is_flat(statements):
+            return _apply_plan(statements, self.flat_plan(statements))
+        return [moment.statement() for moment in self.schedule_moments(statements)]
+
+    def greedy_plan(self, statements):
+        """Schedules the contents of an unscheduled block by placing each instruction in
+        the first moment it fits in, returning the plan."""
+        if self.is_flat(statements):
+            return self.flat_plan(statements)
+        return self.schedule_moments(statements).plan()
+
+    def is_flat(self, statements):
+        """Whether statements can be scheduled by :meth:`flat_plan`."""
+        return not self.constraints.limits and all(
+            type(instr) is GateStatement for instr in statements
+        )
+
+    def flat_plan(self, statements):
+        """
+        Returns the same plan as :meth:`schedule_moments` for statements that are all
+        gates, when there are no limits on moments. Without blocks, loops, or loads to
+        account for, each moment is just a bitmask of qubits and a bitmask of accepted
+        classes, so they're kept in flat lists rather than as :class:`_Moment` objects,
+        and the search for an open moment is done inline.
+        """
+        get_footprint = self.get_footprint
+        footprint_cache = self.footprint_cache
+        freeze_timestamps = [-1] * self.qubit_count
+        plan = []
+        masks = []
+        accepted = []
+        # As in _Schedule, each entry is either its own index or a later moment to
+        # continue searching for an open one from.
+        next_open = []
+        checks = 0
+        scanned = 0
+        longest = 0
+        for unit, instr in enumerate(statements):
+            cached = footprint_cache.get(id(instr))
+            footprint = get_footprint(instr) if cached is None else cached[1]
+            qubits = footprint.qubits
+            defrost = 0
+            for qubit in qubits:
+                if freeze_timestamps[qubit] >= defrost:
+                    defrost = freeze_timestamps[qubit] + 1
+            earliest = defrost
+            count = len(plan)
+            accepts = footprint.accepts
+            if not accepts:
+                defrost = count
+            else:
+                mask = footprint.mask
+                classes = footprint.classes
+                while True:
+                    root = defrost
+                    while root < count and next_open[root] != root:
+                        root = next_open[root]
+                    while defrost < count and next_open[defrost] != defrost:
+                        next_open[defrost], defrost = root, next_open[defrost]
+                    if root >= count:
+                        defrost = count
+                        break
+                    checks += 1
+                    if not (masks[root] & mask or classes & ~accepted[root]):
+                        defrost = root
+                        break
+                    defrost = root + 1
+            length = defrost - earliest
+            scanned += length
+            if length > longest:
+                longest = length
+            if defrost == count:
+                plan.append([unit])
+                masks.append(footprint.mask)
+                accepted.append(accepts)
+                next_open.append(count if accepts else count + 1)
+            else:
+                plan[defrost].append(unit)
+                masks[defrost] |= footprint.mask
+                accepted[defrost] &= accepts
+            for qubit in qubits:
+                freeze_timestamps[qubit] = defrost
+        if self.stats is not None:
+            self.stats.conflict_checks += checks
+            self.stats.scan_length += scanned
+            self.stats.longest_scan = max(self.stats.longest_scan, longest)
+        return plan
+
+    def schedule_moments(self, statements, commute=False):
+        freeze_timestamps = [-1] * self.qubit_count
+        if commute:
+            # For each qubit, the axis shared by every gate on it after some moment, and
+            # that moment: a gate along the same axis only has to follow it.
+            runs = ([None] * self.qubit_count, [-1] * self.qubit_count)
+        else:
+            runs = None
+        moments = _Schedule()
+        for instr in statements:
+            self.schedule_instr(instr, moments, freeze_timestamps, runs=runs)
+        return moments
+
+    def get_footprint(self, instr):
+        # Statements aren't hashable, so we key by identity, and hold on to the statement
+        # itself so its id can't be reused by another object while we're scheduling.
+        try:
+            return self.footprint_cache[id(instr)][1]
+        except KeyError:
+            if self.stats is not None:
+                start = perf_counter()
+            qubits = self.get_qubit_ids(instr)
+            mask = 0
+            for qubit in qubits:
+                mask |= 1 << qubit
+            if isinstance(instr, BlockStatement) and instr.parallel:
+                # A block can share a moment with whatever all of its contents can.
+                classes = 0
+                accepts = -1
+                load = 0
+                for sub_instr in instr:
+                    sub_classes, sub_accepts, sub_load = self.get_classes(sub_instr)
+                    classes |= sub_classes
+                    accepts &= sub_accepts
+                    if not self.constraints.fits(load, sub_load):
+                        # It's over a limit by itself, so it can't share a moment.
+                        accepts = 0
+                    elif accepts:
+                        load += sub_load
+            else:
+                classes, accepts, load = self.get_classes(instr)
+            if self.durations is None:
+                duration = None
+            else:
+                duration = statement_duration(instr, self.durations)
+            if self.commute is None:
+                axes = None
+            else:
+                axes = self.get_axes(instr, qubits)
+            footprint = _Footprint(qubits, mask, classes, accepts, load, duration, axes)
+            self.footprint_cache[id(instr)] = (instr, footprint)
+            if self.stats is not None:
+                self.stats.footprint_time += perf_counter() - start
+            return footprint
 
-    def schedule_instr(self, instr, target, freeze_timestamps, after=-1):
+    def get_axes(self, instr, qubits):
+        axis_by_qubit = {}
+        if isinstance(instr, BlockStatement) and instr.parallel:
+            sub_instrs = instr
+        else:
+            sub_instrs = [instr]
+        for sub_instr in sub_instrs:
+            if isinstance(sub_instr, GateStatement) and not isinstance(
+                sub_instr.gate_def, Macro
+            ):
+                axis = gate_axis(sub_instr, self.commute)
+                for qubit in self.get_qubit_ids(sub_instr):
+                    axis_by_qubit[qubit] = axis
+        return tuple(axis_by_qubit.get(qubit) for qubit in qubits)
+
+    def get_classes(self, instr):
+        """Returns the bitmask of the classes of operation in instr, the bitmask of
+        classes it may share a moment with, and its load against any limits on moments;
+        see :class:`ConstraintTable`."""
+        if isinstance(instr, GateStatement):
+            if self.macros:
+                summary = self.get_macro(instr.gate_def)
+                if summary is not None:
+                    return summary.classes, summary.accepts, summary.load
+            gate_class = self.constraints.gate_class(instr.name)
+        else:
+            gate_class = EXCLUSIVE  # Too much nested structure.
+        constraints = self.constraints
+        return (
+            1 << gate_class,
+            constraints.accepts[gate_class],
+            constraints.usage[gate_class],
+        )
+
+    def get_macro(self, macro):
+        """
+        Returns what's known about calls to macro once its body has been scheduled, as a
+        :class:`_MacroSummary`, scheduling it the first time it's asked for. Returns None
+        if macro isn't a macro, or its body can't be scheduled on its own.
+        """
+        if not isinstance(macro, Macro):
+            return None
+        try:
+            return self.macro_cache[id(macro)][1]
+        except KeyError:
+            pass
+        context = SchedulerContext(
+            self.registers,
+            self.native_gates,
+            constraints=self.constraints,
+            commute=self.commute or False,
+            macros=True,
+            lookahead=self.lookahead,
+            time_budget=self.time_budget,
+            parameters=macro.parameters,
+        )
+        # Macros called from this one are shared with it.
+        context.macro_cache = self.macro_cache
+        try:
+            body = SchedulerVisitor().visit(macro.body, context)
+            moments = body.statements
+            qubits = set()
+            for moment in moments:
+                qubits.update(context.get_qubit_ids(moment))
+        except JaqalError:
+            # E.g. a register is passed as a parameter, which the scheduler can't follow.
+            summary = None
+        else:
+            names = {offset: name for name, offset in context.parameter_offsets.items()}
+            inline = None
+            if len(moments) == 1:
+                footprint = context.get_footprint(moments[0])
+                classes, accepts = footprint.classes, footprint.accepts
+                load = footprint.load
+            else:
+                classes = 1 << EXCLUSIVE
+                accepts = self.constraints.accepts[EXCLUSIVE]
+                load = self.constraints.usage[EXCLUSIVE]
+                # A body that's entirely unscheduled may be scheduled together with the
+                # rest of the block it's called from instead, which is only worthwhile
+                # if something else could join it.
+                if any(context.get_footprint(moment).accepts for moment in moments):
+                    inline = _unscheduled_body(macro)
+            summary = _MacroSummary(
+                macro.copy(body=body),
+                tuple(names.get(qubit, qubit) for qubit in sorted(qubits)),
+                classes,
+                accepts,
+                load,
+                inline,
+            )
+        self.macro_cache[id(macro)] = (macro, summary)
+        return summary
+
+    def inline_macros(self, statements):
+        """If scheduling macros, returns the contents of an unscheduled block with every
+        call to a macro that should be inlined replaced by the contents of its body, and
+        otherwise returns statements itself."""
+        if not self.macros:
+            return statements
+        inlined = []
+        for instr in statements:
+            if isinstance(instr, GateStatement):
+                summary = self.get_macro(instr.gate_def)
+                if summary is not None and summary.inline is not None:
+                    replacer = GateReplacer(instr.parameters_by_name, {})
+                    body = replacer.visit(summary.inline)
+                    inlined.extend(self.inline_macros(body))
+                    continue
+            elif isinstance(instr, BlockStatement) and not instr.parallel:
+                instr = BlockStatement(statements=self.inline_macros(instr))
+            inlined.append(instr)
+        return inlined
+
+    def rebind(self, instr):
+        """If scheduling macros, returns instr with every call to a macro replaced by a
+        call to the macro with its scheduled body, and otherwise returns instr itself."""
+        if not self.macros:
+            return instr
+        if isinstance(instr, GateStatement):
+            summary = self.get_macro(instr.gate_def)
+            if summary is None:
+                return instr
+            return summary.definition(**instr.parameters_by_name)
+        elif isinstance(instr, BlockStatement):
+            return type(instr)(
+                statements=[self.rebind(sub_instr) for sub_instr in instr],
+                parallel=instr.parallel,
+            )
+        elif isinstance(instr, LoopStatement):
+            return LoopStatement(instr.iterations, self.rebind(instr.statements))
+        return instr
+
+    def get_qubit_ids(self, instr):
+        if isinstance(instr, GateStatement) and not isinstance(instr.gate_def, Macro):
+            # The common case of a native gate called on named qubits can be resolved
+            # directly, without the overhead of a visitor.
+            qubits = []
+            for param in instr.used_qubits:
+                if param is all:
+                    return tuple(range(self.qubit_count))
+                if isinstance(param, NamedQubit):
+                    reg, idx = param.resolve_qubit()
+                    qubits.append(self.qubit_offsets[reg.name] + idx)
+                elif (
+                    isinstance(param, Parameter)
+                    and param.name in self.parameter_offsets
+                ):
+                    qubits.append(self.parameter_offsets[param.name])
+                else:
+                    break
+            else:
+                return tuple(qubits)
+        elif isinstance(instr, GateStatement) and self.macros:
+            summary = self.get_macro(instr.gate_def)
+            if summary is not None:
+                qubits = set()
+                for qubit in summary.qubits:
+                    if isinstance(qubit, str):
+                        qubit = self.get_qubit_id(instr.parameters_by_name[qubit])
+                    qubits.add(qubit)
+                return tuple(sorted(qubits))
+        if isinstance(instr, (BlockStatement, LoopStatement)):
+            # Resolve one statement at a time, so gates can take the path above.
+            if isinstance(instr, BlockStatement):
+                sub_instrs = instr
+            else:
+                sub_instrs = [instr.statements]
+            qubits = set()
+            for sub_instr in sub_instrs:
+                qubits.update(self.get_qubit_ids(sub_instr))
+            return tuple(sorted(qubits))
+        if self.parameter_offsets:
+            # The visitor can't resolve the parameters of the macro being scheduled.
+            raise JaqalError("Can't find the qubits of %s." % str(instr))
         used_qubits = _get_used_qubit_indices(instr, self.all_qubits)
+        return tuple(
+            self.qubit_offsets[reg] + idx
+            for reg in used_qubits
+            for idx in sorted(used_qubits[reg])
+        )
+
+    def get_qubit_id(self, qubit):
+        """Returns the id of a single qubit passed to a gate."""
+        if isinstance(qubit, NamedQubit):
+            reg, idx = qubit.resolve_qubit()
+            return self.qubit_offsets[reg.name] + idx
+        if isinstance(qubit, Parameter) and qubit.name in self.parameter_offsets:
+            return self.parameter_offsets[qubit.name]
+        raise JaqalError("Can't find the qubit %s." % str(qubit))
+
+    def schedule_instr(self, instr, target, freeze_timestamps, after=-1, runs=None):
         is_block = isinstance(instr, BlockStatement)
         is_gate = isinstance(instr, GateStatement)
         is_loop = isinstance(instr, LoopStatement)
         if (is_block and instr.parallel) or is_gate:
+            footprint = self.get_footprint(instr)
+            unit = target.next_unit()
             defrost = 0
-            for reg in used_qubits:
-                for idx in used_qubits[reg]:
-                    defrost = max(after + 1, defrost, freeze_timestamps[reg][idx] + 1)
-            while defrost < len(target) and not self.can_parallelize(
-                target[defrost], instr, used_qubits
-            ):
-                defrost += 1
+            if runs is None:
+                for qubit in footprint.qubits:
+                    if freeze_timestamps[qubit] >= defrost:
+                        defrost = freeze_timestamps[qubit] + 1
+            else:
+                run_axes, run_floors = runs
+                for qubit, axis in zip(footprint.qubits, footprint.axes):
+                    if axis is not None and axis == run_axes[qubit]:
+                        floor = run_floors[qubit]
+                    else:
+                        floor = freeze_timestamps[qubit]
+                    if floor >= defrost:
+                        defrost = floor + 1
+            if footprint.qubits and defrost <= after:
+                defrost = after + 1
+            if defrost < target.start:
+                defrost = target.start
+            earliest = defrost
+            checks = 0
+            if not footprint.accepts:
+                # Every moment already holds something, so this needs a new one.
+                defrost = len(target)
+            else:
+                defrost = target.next_open(defrost)
+                while defrost < len(target):
+                    checks += 1
+                    if self.can_parallelize(target[defrost], footprint):
+                        break
+                    defrost = target.next_open(defrost + 1)
+            if self.stats is not None:
+                self.stats.record_scan(checks, min(defrost, len(target)) - earliest)
             if defrost >= len(target):
-                target.append([instr])
-            elif is_block:
-                target[defrost].extend(instr.statements)
+                # A block that gets a moment to itself is kept intact, so nothing else
+                # can be added to its moment afterwards.
+                target.append(
+                    _Moment(
+                        [instr],
+                        footprint.mask,
+                        footprint.classes,
+                        0 if is_block else footprint.accepts,
+                        [unit],
+                        footprint.load,
+                    )
+                )
             else:
-                target[defrost].append(instr)
+                target[defrost].add(instr, footprint, unit)
+            constraints = self.constraints
+            if constraints.limits:
+                moment = target[defrost]
+                if moment.accepts and constraints.full(moment.load, moment.accepts):
+                    # Skip moments at their limits as if they were exclusive.
+                    target.close(defrost)
         elif is_block:
             # You can't nest two sequential blocks, so we flatten the block.
             for sub_instr in instr:
-                after = self.schedule_instr(sub_instr, target, freeze_timestamps, after)
+                after = self.schedule_instr(
+                    sub_instr, target, freeze_timestamps, after, runs
+                )
             return after  # We've frozen all the relevant qubits already.
         elif is_loop:
             # Loop statements can't be parallelized with anything; just stick it at the end
+            footprint = self.get_footprint(instr)
             defrost = len(target)  # Any qubit used in the loop shouldn't be touched
-            target.append([instr])  # Until after the loop finishes
+            target.append(
+                _Moment(
+                    [instr], footprint.mask, footprint.classes, 0, [target.next_unit()]
+                )
+            )
+            # Until after the loop finishes
         else:
             raise JaqalError("Can't schedule instruction %s." % str(instr))
-        for reg in used_qubits:
-            for idx in used_qubits[reg]:
-                freeze_timestamps[reg][idx] = defrost
+        if runs is None:
+            for qubit in footprint.qubits:
+                freeze_timestamps[qubit] = defrost
+        else:
+            # Gates may now be placed before the latest one on a qubit, so the freeze
+            # timestamps are no longer monotonic.
+            run_axes, run_floors = runs
+            axes = footprint.axes or (None,) * len(footprint.qubits)
+            for qubit, axis in zip(footprint.qubits, axes):
+                if axis is not None and axis == run_axes[qubit]:
+                    if defrost > freeze_timestamps[qubit]:
+                        freeze_timestamps[qubit] = defrost
+                else:
+                    run_axes[qubit] = axis
+                    run_floors[qubit] = freeze_timestamps[qubit]
+                    freeze_timestamps[qubit] = defrost
         return defrost
 
-    def can_parallelize(self, moment, instr, qubits):
-        for other_instr in moment:
-            other_used_qubits = _get_used_qubit_indices(other_instr, self.all_qubits)
-            for reg in other_used_qubits:
-                if reg in qubits and not other_used_qubits[reg].isdisjoint(qubits[reg]):
-                    return False  # Can't act on the same qubit twice simultaneously.
+    def can_parallelize(self, moment, footprint):
+        # No qubit can be involved in two simultaneous operations, and every class of
+        # operation in the footprint has to be accepted by everything already in the
+        # moment. The constraint table is symmetric, so that's enough to know the moment
+        # is accepted by the footprint too. Which classes are compatible is expected to
+        # change as the hardware evolves, whereas qubit overlap isn't dependent on a
+        # specific hardware implementation. Nor can the moment exceed any limit on how
+        # many operations it holds.
+        constraints = self.constraints
+        return not (
+            moment.mask & footprint.mask
+            or footprint.classes & ~moment.accepts
+            or (moment.load + footprint.load + constraints.headroom)
+            & constraints.overflow
+        )
 
-            if not self.can_parallelize_subinstr(other_instr):
-                return False
 
-            if isinstance(instr, BlockStatement):
-                for sub_instr in instr:
-                    if not self.can_parallelize_gate(moment, sub_instr, qubits):
-                        return False  # If we can parallelize all the components, we can parallelize the block.
-            elif isinstance(instr, GateStatement):
-                return self.can_parallelize_gate(moment, instr, qubits)
-            else:
-                return False  # We don't know what this is, so we can't parallelize it.
-        return True
+class _Schedule:
+    """
+    The moments of a block being scheduled, along with an index that skips over moments
+    holding an exclusive operation. Those can never accept another instruction, and long
+    runs of them would otherwise be scanned one at a time by every later instruction.
+    """
+
+    __slots__ = ("moments", "start", "units", "_base", "_next_open")
+
+    def __init__(self):
+        self.moments = []
+        # Moments before start have been released and can't accept any more
+        # instructions. Released moments are only dropped in batches, so _base is the
+        # index of the first moment still stored; all indices used outside this class
+        # count from the beginning of the block regardless.
+        self.start = 0
+        # How many instructions have been placed so far; see _units.
+        self.units = 0
+        self._base = 0
+        # Each entry is either its own index, if that moment can still accept
+        # instructions, or a pointer to some later moment to continue searching from.
+        self._next_open = []
+
+    def __len__(self):
+        return self._base + len(self.moments)
+
+    def __getitem__(self, idx):
+        return self.moments[idx - self._base]
+
+    def __iter__(self):
+        return islice(self.moments, self.start - self._base, None)
+
+    def next_unit(self):
+        unit = self.units
+        self.units += 1
+        return unit
+
+    def plan(self):
+        """
+        Describes the moments from start onward independently of the statements they
+        contain, as a list holding a list of units for each moment. Each unit is the
+        index of an instruction in the order given by :func:`_units`, or the bitwise
+        complement of that index if the instruction is a parallel block whose contents
+        were merged into the moment. See :func:`_apply_plan`.
+        """
+        return [moment.units for moment in self]
+
+    def append(self, moment):
+        idx = len(self)
+        self.moments.append(moment)
+        self._next_open.append(idx if moment.accepts else idx + 1)
+
+    def close(self, idx):
+        """Prevents any further instructions from being placed in the moment at idx."""
+        self[idx].accepts = 0
+        self._next_open[idx - self._base] = idx + 1
+
+    def next_open(self, idx):
+        """Returns the first moment at or after idx that isn't exclusive, or the number
+        of moments if there is none."""
+        base = self._base
+        next_open = self._next_open
+        end = base + len(next_open)
+        root = idx
+        while root < end and next_open[root - base] != root:
+            root = next_open[root - base]
+        # Compress the path we just followed, so later searches skip it in one step.
+        while idx < end and next_open[idx - base] != idx:
+            next_open[idx - base], idx = root, next_open[idx - base]
+        return root
+
+    def release(self, end):
+        """Returns the moments from start up to end, and prevents any further
+        instructions from being placed in them."""
+        base = self._base
+        released = self.moments[self.start - base : end - base]
+        self.start = end
+        if 2 * (end - base) > len(self.moments):
+            del self.moments[: end - base]
+            del self._next_open[: end - base]
+            self._base = end
+        return released
+
+
+class _Footprint:
+    """The qubits an instruction acts on, the bitmask of the classes of operation in it,
+    the bitmask of classes it may share a moment with, and its load against any limits on
+    moments; see :class:`ConstraintTable`. An instruction that accepts no classes must
+    have a moment to itself. If scheduling for duration, also how long it takes, and if
+    reordering commuting gates, its axis on each of its qubits; see :func:`gate_axis`."""
+
+    __slots__ = ("qubits", "mask", "classes", "accepts", "load", "duration", "axes")
+
+    def __init__(
+        self, qubits, mask, classes, accepts, load=0, duration=None, axes=None
+    ):
+        self.qubits = qubits
+        self.mask = mask
+        self.classes = classes
+        self.accepts = accepts
+        self.load = load
+        self.duration = duration
+        self.axes = axes
+
+
+class _MacroSummary:
+    """What's known about calls to a macro once its body has been scheduled: the macro
+    with the scheduled body, the qubits its body acts on, each either a qubit id or the
+    name of a parameter, the bitmask of the classes of operation a call counts as, the
+    bitmask of classes a call may share a moment with, the load of a call, and if calls
+    should be replaced by the contents of the body instead, the unscheduled block holding
+    them."""
+
+    __slots__ = ("definition", "qubits", "classes", "accepts", "load", "inline")
+
+    def __init__(self, definition, qubits, classes, accepts, load, inline):
+        self.definition = definition
+        self.qubits = qubits
+        self.classes = classes
+        self.accepts = accepts
+        self.load = load
+        self.inline = inline
+
+
+class _Moment:
+    """
+    The statements scheduled to happen simultaneously, along with a summary of which
+    qubits they occupy, the classes of operation they include, the classes all of them
+    accept, and their total load, so deciding whether another instruction fits is a
+    handful of bitwise operations. A moment that accepts nothing is exclusive: nothing
+    more can be added to it.
+    """
+
+    __slots__ = ("statements", "mask", "classes", "accepts", "units", "load")
+
+    def __init__(self, statements, mask, classes, accepts, units, load=0):
+        self.statements = statements
+        self.mask = mask
+        self.classes = classes
+        self.accepts = accepts
+        self.units = units
+        self.load = load
+
+    def statement(self):
+        """The single statement that carries out this moment."""
+        if len(self.statements) > 1:
+            return BlockStatement(statements=self.statements, parallel=True)
+        else:
+            return self.statements[0]
 
-    def can_parallelize_gate(self, block, instr, qubits):
-        if not self.can_parallelize_subinstr(instr):
-            return False
+    def add(self, instr, footprint, unit):
+        if isinstance(instr, BlockStatement):
+            self.statements.extend(instr.statements)
+            self.units.append(~unit)
         else:
-            # We could do other checks here, but right now there's nothing we need to worry
-            # about. Specifically, if there were two instructions that couldn't be in parallel
-            # with each other, even on different qubits, but could be in parallel with other
-            # instructions, this is where we'd test for it. I expect this and
-            # can_parallelize_subinstr to change as our hardware evolves, whereas everything
-            # above shouldn't need to, since it tests for limitations like qubit overlap that
-            # aren't dependent on a specific hardware implementation.
-            return True
-
-    def can_parallelize_subinstr(self, sub_instr):
-        if not isinstance(sub_instr, GateStatement):
-            return False  # Too much nested structure.
-        if sub_instr.name not in self.native_gates:
-            return False  # Can't do macros in parallel, because they could include anything.
-        if len(self.native_gates[sub_instr.name].quantum_parameters) > 1:
-            return False  # Can't do multiple 2-qubit gates at once.
-        return True
+            self.statements.append(instr)
+            self.units.append(unit)
+        self.mask |= footprint.mask
+        self.classes |= footprint.classes
+        self.accepts &= footprint.accepts
+        self.load += footprint.load
+
+
+def _units(statements):
+    """Yields every instruction in statements that the scheduler places as a whole, in
+    the order it places them."""
+    for instr in statements:
+        if isinstance(instr, BlockStatement) and not instr.parallel:
+            yield from _units(instr)
+        else:
+            yield instr
+
+
+def _apply_plan(statements, plan):
+    """Builds the scheduled statements described by a plan, as returned by
+    :meth:`_Schedule.plan`, for statements."""
+    units = list(_units(statements))
+    scheduled = []
+    for moment in plan:
+        if len(moment) == 1 and moment[0] >= 0:
+            scheduled.append(units[moment[0]])
+            continue
+        moment_statements = []
+        for unit in moment:
+            if unit >= 0:
+                moment_statements.append(units[unit])
+            else:
+                moment_statements.extend(units[~unit].statements)
+        if len(moment_statements) > 1:
+            scheduled.append(
+                BlockStatement(statements=moment_statements, parallel=True)
+            )
+        else:
+            scheduled.append(moment_statements[0])
+    return scheduled
+
+
+def _plan_duration(plan, durations):
+    """Estimates how long the moments described by plan take, given the durations of
+    each unit, by assuming each moment takes as long as its longest unit."""
+    total = 0
+    for moment in plan:
+        total += max(durations[unit if unit >= 0 else ~unit] for unit in moment)
+    return total
+
+
+def _unscheduled_body(macro):
+    """Returns the unscheduled block that makes up the whole body of macro, or None."""
+    body = macro.body
+    if not isinstance(body, UnscheduledBlockStatement) and len(body.statements) == 1:
+        body = body.statements[0]
+    return body if isinstance(body, UnscheduledBlockStatement) else None
+
+
+def _find_unscheduled_blocks(block):
+    """Yields every unscheduled block the scheduler would reschedule in block."""
+    if isinstance(block, UnscheduledBlockStatement):
+        yield block
+        return
+    for instr in block:
+        if isinstance(instr, BlockStatement):
+            yield from _find_unscheduled_blocks(instr)
+        elif isinstance(instr, LoopStatement):
+            yield from _find_unscheduled_blocks(instr.statements)
+
+
+def _find_pending(instr, body, macros, pending):
+    """
+    Adds the ids of instr and every block and loop in it that :class:`SchedulerVisitor`
+    has to rebuild to pending, and returns whether there were any. That's any that
+    contain an unscheduled block, a sequential block directly inside a sequential block
+    other than body, which gets flattened, or if macros is true, a call to a macro,
+    which gets rebound to its scheduled definition.
+    """
+    if isinstance(instr, LoopStatement):
+        found = _find_pending(instr.statements, body, macros, pending)
+    elif isinstance(instr, UnscheduledBlockStatement):
+        # It's rebuilt by scheduling it, never by visiting its contents.
+        found = True
+    elif isinstance(instr, BlockStatement):
+        found = False
+        flattens = not instr.parallel and instr is not body
+        for sub_instr in instr:
+            if isinstance(sub_instr, BlockStatement):
+                if _find_pending(sub_instr, body, macros, pending) or (
+                    flattens and not sub_instr.parallel
+                ):
+                    found = True
+            elif isinstance(sub_instr, LoopStatement):
+                if _find_pending(sub_instr, body, macros, pending):
+                    found = True
+            elif macros and isinstance(sub_instr.gate_def, Macro):
+                found = True
+    else:
+        return False
+    if found:
+        pending.add(id(instr))
+    return found
+
+
+def _is_barrier(instr, constraints):
+    """Whether instr acts on every qubit and can't share a moment with anything, so
+    nothing can be moved across it."""
+    return (
+        isinstance(instr, GateStatement)
+        and not isinstance(instr.gate_def, Macro)
+        and any(param is all for param in instr.gate_def.used_qubits)
+        and not constraints.accepts[constraints.gate_class(instr.name)]
+    )
+
+
+def _schedule_segments(blocks, registers, native_gates, workers, options):
+    """
+    Splits every block in blocks at its barriers, schedules the pieces in a pool of
+    worker processes, and returns a plan for each block, as returned by
+    :meth:`_Schedule.plan`. Workers send back only a plan for each piece, so nothing has
+    to be sent back as statements. The options are passed to each
+    :class:`SchedulerContext`.
+    """
+    constraints = options.get("constraints") or constraint_table(native_gates)
+    segments = []
+    # For each block, the ordered pieces it's reassembled from: either the index of a
+    # segment, or None for a barrier, which always gets a moment to itself. Each is
+    # paired with the number of units in the block before it.
+    layouts = []
+    for block in blocks:
+        layout = []
+        segment = []
+        offset = 0
+        units = 0
+        for instr in block:
+            if _is_barrier(instr, constraints):
+                if segment:
+                    layout.append((len(segments), offset))
+                    segments.append(segment)
+                    segment = []
+                layout.append((None, units))
+                units += 1
+                offset = units
+            else:
+                segment.append(instr)
+                units += sum(1 for _ in _units([instr]))
+        if segment:
+            layout.append((len(segments), offset))
+            segments.append(segment)
+        layouts.append(layout)
+
+    # Send several segments to each task, so small segments don't each pay for a round
+    # trip to a worker process.
+    chunksize = max(1, -(-len(segments) // (4 * workers)))
+    chunks = [
+        segments[start : start + chunksize]
+        for start in range(0, len(segments), chunksize)
+    ]
+    scheduled = []
+    if chunks:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for result in executor.map(
+                _schedule_chunk,
+                repeat(registers, len(chunks)),
+                repeat(native_gates, len(chunks)),
+                repeat(options, len(chunks)),
+                chunks,
+            ):
+                scheduled.extend(result)
+
+    plans = []
+    for layout in layouts:
+        plan = []
+        for piece, offset in layout:
+            if piece is None:
+                plan.append([offset])
+                continue
+            for moment in scheduled[piece]:
+                plan.append(
+                    [
+                        unit + offset if unit >= 0 else ~(~unit + offset)
+                        for unit in moment
+                    ]
+                )
+        plans.append(plan)
+    return plans
+
+
+def _plan_circuit(circ, options):
+    """Returns a plan for each unscheduled block in circ, in the order they're found by
+    :func:`_find_unscheduled_blocks`."""
+    context = SchedulerContext(
+        circ.fundamental_registers(), circ.native_gates, circ.body, **options
+    )
+    return [
+        context.plan(context.inline_macros(block))
+        for block in _find_unscheduled_blocks(circ.body)
+    ]
+
+
+def _schedule_chunk(registers, native_gates, options, segments):
+    context = SchedulerContext(registers, native_gates, **options)
+    return [context.plan(segment) for segment in segments]
 
 
 def _get_used_qubit_indices(obj, all_qubits=None):
@@ -0,0 +1,105 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+from threading import Lock
+
+from jaqalpaq.core import BlockStatement, LoopStatement, GateStatement
+
+
+class SchedulerStats:
+    """
+    Counts what the scheduler did and where it spent its time. Pass one to
+    :func:`schedule_circuit` or :func:`schedule_circuits` as `stats`; the counts from
+    every call it's passed to accumulate until it's cleared.
+
+    Each call counts into a record of its own, which is added to this one once the
+    circuit is done, so a single object may be shared between threads. Only work done in
+    the calling process is timed and counted: with worker processes, blocks are placed
+    elsewhere, so only the blocks, gates, and moments they produce are counted here.
+    """
+
+    _fields = (
+        "blocks",
+        "gates",
+        "moments",
+        "conflict_checks",
+        "scan_length",
+        "longest_scan",
+        "footprint_time",
+        "placement_time",
+    )
+
+    def __init__(self):
+        self._lock = Lock()
+        #: How many unscheduled blocks were scheduled.
+        self.blocks = 0
+        #: How many gates those blocks contain.
+        self.gates = 0
+        #: How many moments those blocks were scheduled into.
+        self.moments = 0
+        #: How many times an instruction was checked against a moment it might join.
+        self.conflict_checks = 0
+        #: The total number of moments instructions were moved past, beyond the first
+        #: they could follow, while looking for one to join.
+        self.scan_length = 0
+        #: The most moments any one instruction was moved past.
+        self.longest_scan = 0
+        #: Seconds spent working out which qubits each instruction acts on and how it
+        #: can be parallelized.
+        self.footprint_time = 0.0
+        #: Seconds spent scheduling blocks, apart from footprint_time.
+        self.placement_time = 0.0
+
+    @property
+    def parallelism(self):
+        """The average number of gates in each moment."""
+        return self.gates / self.moments if self.moments else 0.0
+
+    def add(self, other):
+        """Adds the counts from other to this object."""
+        with self._lock:
+            for field in self._fields:
+                if field == "longest_scan":
+                    self.longest_scan = max(self.longest_scan, other.longest_scan)
+                else:
+                    setattr(self, field, getattr(self, field) + getattr(other, field))
+
+    def clear(self):
+        """Resets every count."""
+        with self._lock:
+            for field in self._fields:
+                setattr(self, field, type(getattr(self, field))())
+
+    def as_dict(self):
+        """Returns every count, along with the parallelism, as a dict, e.g. to log."""
+        with self._lock:
+            counts = {field: getattr(self, field) for field in self._fields}
+        counts["parallelism"] = self.parallelism
+        return counts
+
+    def record_block(self, moments, elapsed):
+        """Counts a block scheduled into moments, having taken elapsed seconds apart
+        from any footprint_time."""
+        self.blocks += 1
+        self.moments += len(moments)
+        self.gates += sum(count_gates(moment) for moment in moments)
+        self.placement_time += elapsed
+
+    def record_scan(self, checks, length):
+        """Counts an instruction checked against checks moments, having been moved past
+        length moments."""
+        self.conflict_checks += checks
+        self.scan_length += length
+        if length > self.longest_scan:
+            self.longest_scan = length
+
+
+def count_gates(instr):
+    """Returns how many gates appear in instr, counting the body of a loop once."""
+    if isinstance(instr, GateStatement):
+        return 1
+    elif isinstance(instr, BlockStatement):
+        return sum(count_gates(sub_instr) for sub_instr in instr)
+    elif isinstance(instr, LoopStatement):
+        return count_gates(instr.statements)
+    return 0
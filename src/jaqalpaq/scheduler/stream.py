@@ -0,0 +1,62 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+from .scheduler import SchedulerContext, _Schedule
+
+
+def schedule_stream(
+    statements, registers, native_gates, max_moments=None, constraints=None
+):
+    """
+    Schedules a sequence of statements as if they formed a single unscheduled block, but
+    without needing them all in memory at once. Each moment of the schedule is produced
+    as soon as no later statement could be placed in it, so arbitrarily long gate
+    sequences can be scheduled in bounded memory.
+
+    A moment is final once every qubit has been acted on by some statement after it, so
+    a prepare_all or measure_all finalizes everything before it. Qubits that sit idle
+    hold back every moment after the last time they were used; pass `max_moments` to
+    bound how many moments are held in that case.
+
+    For a sequence of gates, the moments produced are the same as the statements of the
+    block :func:`schedule_circuit` would produce from an unscheduled block containing
+    them, subject to the same restrictions on parallelization, except that gates acting
+    on no qubits are never placed in a moment that's already been produced, and except
+    where `max_moments` forces moments to be produced early.
+
+    :param statements: The statements to schedule, in program order. Typically
+        :class:`jaqalpaq.core.GateStatement`, but any statement that may appear in an
+        unscheduled block is accepted.
+    :type statements: iterable(GateStatement)
+    :param registers: The fundamental registers of the circuit the statements act on, as
+        returned by :meth:`jaqalpaq.core.Circuit.fundamental_registers`.
+    :type registers: list(jaqalpaq.core.Register)
+    :param dict native_gates: The native gates of the circuit the statements act on.
+    :param max_moments: If given, never hold more than this many moments waiting to
+        become final; the oldest are produced early, and no later statement is placed in
+        them.
+    :type max_moments: int or None
+    :param constraints: The rules for which operations may share a moment. Defaults to
+        the QSCOUT rules for native_gates.
+    :type constraints: ConstraintTable or None
+    :returns: The statements of the scheduled sequential block, one per moment: a gate
+        or other statement on its own, or a parallel block.
+    :rtype: generator
+    """
+
+    context = SchedulerContext(registers, native_gates, constraints=constraints)
+    freeze_timestamps = [-1] * context.qubit_count
+    moments = _Schedule()
+    for instr in statements:
+        context.schedule_instr(instr, moments, freeze_timestamps)
+        # Nothing needs an instruction's footprint once it's been placed, and keeping
+        # them around would defeat the point.
+        context.footprint_cache.clear()
+        final = min(freeze_timestamps) + 1 if freeze_timestamps else len(moments)
+        if max_moments is not None and len(moments) - final > max_moments:
+            final = len(moments) - max_moments
+        if final > moments.start:
+            for moment in moments.release(final):
+                yield moment.statement()
+    for moment in moments.release(len(moments)):
+        yield moment.statement()
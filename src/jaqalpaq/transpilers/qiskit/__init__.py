@@ -4,15 +4,19 @@
 from .frontend import (
     jaqal_circuit_from_dag_circuit,
     jaqal_circuit_from_qiskit_circuit,
+    jaqal_template_from_qiskit_circuit,
     qiskit_circuit_from_jaqal_circuit,
     ion_pass_manager,
 )
+from .cache import TranspileCache
 from .gates import JaqalMSGate, SYGate, SYdgGate, JaqalRGate
 from .instance import get_ion_instance
+from .template import JaqalTemplate
 
 __all__ = [
     "jaqal_circuit_from_dag_circuit",
     "jaqal_circuit_from_qiskit_circuit",
+    "jaqal_template_from_qiskit_circuit",
     "qiskit_circuit_from_jaqal_circuit",
     "ion_pass_manager",
     "JaqalMSGate",
@@ -20,4 +24,6 @@ __all__ = [
     "SYdgGate",
     "JaqalRGate",
     "get_ion_instance",
+    "JaqalTemplate",
+    "TranspileCache",
 ]
@@ -0,0 +1,142 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+import pickle
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+from qiskit.circuit import ParameterExpression
+
+
+class TranspileCache:
+    """
+    Remembers how Qiskit circuits were unrolled and converted to Jaqal, so that a circuit
+    with the same structure as one seen before doesn't have to be transpiled again. Each
+    :func:`get_ion_instance` has one, which may be replaced to change its limits.
+
+    Circuits are keyed by their registers, and the name, qubits, classical bits,
+    condition, and parameters of each of their instructions, in order; see
+    :func:`circuit_fingerprint`. Their names are ignored. When the cache is full, the
+    entries that were used least recently are discarded.
+
+    A cache may be shared between threads and between instances; each instance's
+    conversion settings are part of its keys.
+
+    :param int maxsize: The most circuits to remember, or None for no limit.
+    :param maxbytes: If given, the most bytes the remembered circuits may take, as
+        measured by the size they pickle to.
+    :type maxbytes: int or None
+    """
+
+    def __init__(self, maxsize=128, maxbytes=None):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        #: How many lookups found a transpiled circuit.
+        self.hits = 0
+        #: How many lookups had to transpile the circuit from scratch.
+        self.misses = 0
+        #: How many bytes the remembered circuits take, if `maxbytes` is given.
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Returns the entry stored for key, or None, counting a hit or miss."""
+        with self._lock:
+            try:
+                entry, _ = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        """Stores entry for key, discarding the least recently used entries until the
+        cache is within its limits."""
+        size = 0 if self.maxbytes is None else len(pickle.dumps(entry))
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self._entries[key] = (entry, size)
+            self.nbytes += size
+            while self._entries and (
+                (self.maxsize is not None and len(self._entries) > self.maxsize)
+                or (self.maxbytes is not None and self.nbytes > self.maxbytes)
+            ):
+                _, (_, old_size) = self._entries.popitem(last=False)
+                self.nbytes -= old_size
+
+    def clear(self):
+        """Discards every stored entry and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.nbytes = 0
+
+
+def circuit_fingerprint(circuit):
+    """
+    Returns a hashable description of everything about a Qiskit circuit that affects how
+    it's transpiled: its registers, global phase, and the name, qubits, classical bits,
+    condition, and parameters of each of its instructions. Instructions that aren't from
+    Qiskit's standard library, such as custom gates, are described by their definitions
+    as well, since their names alone needn't tell them apart.
+
+    :param qiskit.circuit.QuantumCircuit circuit: The circuit to describe.
+    :returns: The description, which is equal for two circuits exactly when they're
+        transpiled the same way.
+    :rtype: tuple
+    """
+    qubits = {bit: idx for idx, bit in enumerate(circuit.qubits)}
+    clbits = {bit: idx for idx, bit in enumerate(circuit.clbits)}
+    instructions = []
+    for op, qargs, cargs in circuit.data:
+        condition = getattr(op, "condition", None)
+        if condition is not None:
+            target, value = condition
+            condition = (getattr(target, "name", None) or clbits[target], value)
+        definition = None
+        if not type(op).__module__.startswith(("qiskit.circuit.library", "jaqalpaq.")):
+            if op.definition is not None:
+                definition = circuit_fingerprint(op.definition)
+        instructions.append(
+            (
+                op.name,
+                tuple(qubits[qubit] for qubit in qargs),
+                tuple(clbits[clbit] for clbit in cargs),
+                condition,
+                tuple(_parameter_key(param) for param in op.params),
+                definition,
+            )
+        )
+    return (
+        tuple((qreg.name, qreg.size) for qreg in circuit.qregs),
+        tuple((creg.name, creg.size) for creg in circuit.cregs),
+        _parameter_key(circuit.global_phase),
+        tuple(instructions),
+    )
+
+
+def _parameter_key(param):
+    """Returns a hashable form of an instruction's parameter."""
+    if isinstance(param, ParameterExpression):
+        if param.parameters:
+            # Parameters are compared by identity, not name, as a transpiled circuit
+            # can only be bound with the parameters it was transpiled with.
+            return (str(param), frozenset(param.parameters))
+        return float(param)
+    elif isinstance(param, np.ndarray):
+        return (param.shape, param.dtype.str, param.tobytes())
+    try:
+        hash(param)
+    except TypeError:
+        return repr(param)
+    return param
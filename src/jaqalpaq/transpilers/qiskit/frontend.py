@@ -8,11 +8,12 @@ from jaqalpaq.core.algorithm.visitor import Visitor
 from jaqalpaq.core.algorithm.fill_in_map import fill_in_map
 
 # from qscoutlib import MSGate, QasmGate, IonUnroller
-from qiskit.converters import dag_to_circuit
+from qiskit.converters import dag_to_circuit, circuit_to_dag
 from jaqalpaq.error import JaqalError
 
 # from sympy.core.evalf import N
 import numpy as np
+from threading import Lock
 
 from qiskit.transpiler.passes import UnrollCustomDefinitions, BasisTranslator
 from qiskit.qasm import pi
@@ -26,12 +27,17 @@ from qiskit.circuit import (
     QuantumRegister,
     QuantumCircuit,
     Parameter,
+    ParameterVector,
+    ParameterExpression,
     EquivalenceLibrary,
+    Gate,
 )
+from qiskit.dagcircuit import DAGCircuit
 from qiskit.circuit.library.standard_gates.equivalence_library import (
     StandardEquivalenceLibrary,
 )
 from .gates import JaqalMSGate, SYGate, SYdgGate, JaqalRGate
+from .template import JaqalTemplate
 from qiskit.transpiler import PassManager
 
 
@@ -109,7 +115,45 @@ def jaqal_circuit_from_qiskit_circuit(
     :raises JaqalError: If the user tries to measure or reset only some of the qubits,
         rather than all of them.
     :raises JaqalError: If the circuit includes a gate not included in `names`.
+    :raises JaqalError: If any of the circuit's parameters are unbound. To convert such a
+        circuit, see :func:`jaqal_template_from_qiskit_circuit`.
     """
+    return _convert_qiskit_circuit(circuit, names, native_gates, param_maps, None)
+
+
+def jaqal_template_from_qiskit_circuit(
+    circuit, names=None, native_gates=None, param_maps=None
+):
+    """
+    Converts a Qiskit circuit with unbound parameters, which should already be unrolled,
+    to a :class:`JaqalTemplate`. This is converted just as
+    :func:`jaqal_circuit_from_qiskit_circuit` converts a circuit, except that each
+    distinct gate angle that depends on the parameters becomes a let constant, named
+    param0, param1, and so on. Values for the parameters can then be bound with
+    :meth:`JaqalTemplate.bind` as often as needed, without converting the circuit again.
+
+    :param qiskit.circuit.QuantumCircuit circuit: The circuit to convert.
+    :param names: As for :func:`jaqal_circuit_from_qiskit_circuit`.
+    :type names: dict or None
+    :param native_gates: The native gate set to target. If None, target the QSCOUT native
+        gates.
+    :type native_gates: dict or None
+    :param param_maps: As for :func:`jaqal_circuit_from_qiskit_circuit`. Angles that
+        depend on the parameters are passed to them as let constants.
+    :type param_maps: dict or None
+    :returns: The converted circuit, with its angles left to be bound.
+    :rtype: JaqalTemplate
+    :raises JaqalError: As :func:`jaqal_circuit_from_qiskit_circuit` does.
+    """
+    slots = {}
+    jcircuit = _convert_qiskit_circuit(circuit, names, native_gates, param_maps, slots)
+    return JaqalTemplate(jcircuit, slots, circuit.parameters)
+
+
+def _convert_qiskit_circuit(circuit, names, native_gates, param_maps, slots):
+    """Does the work of :func:`jaqal_circuit_from_qiskit_circuit`. If slots is a dict,
+    each angle that depends on a parameter becomes a let constant, which is added to it
+    by name along with the expression it stands for."""
     if native_gates is None:
         from qscout.v1.std.jaqal_gates import ALL_GATES as native_gates
     n = sum([qreg.size for qreg in circuit.qregs])
@@ -126,6 +170,22 @@ def jaqal_circuit_from_qiskit_circuit(
             qreg.name, baseregister, slice(offset, offset + qreg.size)
         )
         offset += qreg.size
+    lets = {}
+
+    def angle(param):
+        if isinstance(param, ParameterExpression) and param.parameters:
+            if slots is None:
+                raise JaqalError("Parameter %s is unbound." % param)
+            key = str(param)
+            if key not in lets:
+                name = "param%d" % len(lets)
+                while name in registers or name == "baseregister":
+                    name = "_" + name
+                lets[key] = qsc.let(name, 0)
+                slots[name] = param
+            return lets[key]
+        return float(param)
+
     # We're going to divide the circuit up into blocks. Each block will contain every gate
     # between one barrier statement and the next. If the circuit is output with no further
     # processing, then the gates in each block will be run in sequence. However, if the
@@ -222,7 +282,7 @@ def jaqal_circuit_from_qiskit_circuit(
             block.gate(
                 names[instr[0].name],
                 *[registers[target.register.name][target.index] for target in targets],
-                *param_map(targets, (float(param) for param in instr[0].params))
+                *param_map(targets, (angle(param) for param in instr[0].params))
             )
         else:
             raise JaqalError(
@@ -379,20 +439,101 @@ def ion_equivalence_library():
     return el
 
 
-def ion_pass_manager():
+def ion_pass_manager(basis_gates=None):
     """
     Constructs a `qiskit.transpiler.PassManager` that will unroll a circuit into the
     QSCOUT standard gate set. Pass a `qiskit.circuit.Circuit` object into its `run` method
     to perform the unrolling.
 
+    The passes it runs, and the equivalence library they use, are built once for each
+    basis and shared by every pass manager this returns, and each gate's translation is
+    worked out the first time it's seen and remembered after that. They may be run from
+    several threads at once.
+
+    :param basis_gates: The names of the Qiskit gates to unroll into. Defaults to those
+        that correspond to the QSCOUT native gates.
+    :type basis_gates: iterable(str) or None
     :returns: The pass manager.
     :rtype: qiskit.transpiler.PassManager
     """
     pm = PassManager()
-    basis_gates = _QISKIT_NAMES.keys()
-    el = ion_equivalence_library()
+    pm.append(_ion_passes(basis_gates))
+    return pm
+
+
+# The equivalence library shared by every pass manager, and the passes for each basis.
+_shared_equivalence_library = None
+_shared_passes = {}
+_shared_passes_lock = Lock()
+
 
-    pm.append(
-        [UnrollCustomDefinitions(el, basis_gates), BasisTranslator(el, basis_gates)]
+def _ion_passes(basis_gates=None):
+    """Returns the shared passes that unroll a circuit into basis_gates."""
+    global _shared_equivalence_library
+
+    basis_gates = frozenset(_QISKIT_NAMES if basis_gates is None else basis_gates)
+    passes = _shared_passes.get(basis_gates)
+    if passes is None:
+        with _shared_passes_lock:
+            passes = _shared_passes.get(basis_gates)
+            if passes is None:
+                if _shared_equivalence_library is None:
+                    _shared_equivalence_library = ion_equivalence_library()
+                el = _shared_equivalence_library
+                passes = [
+                    UnrollCustomDefinitions(el, basis_gates),
+                    _MemoizedBasisTranslator(el, basis_gates),
+                ]
+                _shared_passes[basis_gates] = passes
+    return passes
+
+
+class _MemoizedBasisTranslator(BasisTranslator):
+    """
+    A `BasisTranslator` that searches for the translation of each gate, by its name, qubit
+    count, and number of parameters, only the first time it sees it. After that, the
+    translation it found is reused, with the gate's parameters substituted in.
+    """
+
+    # Instructions that are left alone, as BasisTranslator leaves them.
+    _basic_instructions = frozenset(
+        ("measure", "reset", "barrier", "snapshot", "delay")
     )
-    return pm
+
+    def __init__(self, equivalence_library, target_basis):
+        super().__init__(equivalence_library, target_basis)
+        self._translations = {}
+        self._lock = Lock()
+
+    def run(self, dag):
+        for node in dag.op_nodes():
+            if node.name in self._target_basis or node.name in self._basic_instructions:
+                continue
+            params, translation = self._translation(node.op)
+            if params:
+                # Parameters are assigned in a circuit, as DAGCircuits don't have a
+                # ParameterTable.
+                circuit = dag_to_circuit(translation)
+                circuit.assign_parameters(
+                    dict(zip(params, node.op.params)), inplace=True
+                )
+                translation = circuit_to_dag(circuit)
+            dag.substitute_node_with_dag(node, translation)
+        return dag
+
+    def _translation(self, op):
+        """Returns the parameters standing in for op's, and a DAGCircuit in terms of
+        them that op translates to."""
+        key = (op.name, op.num_qubits, len(op.params))
+        translation = self._translations.get(key)
+        if translation is None:
+            # Translate a stand-in for op, as BasisTranslator does itself.
+            params = list(ParameterVector(op.name, len(op.params)))
+            dag = DAGCircuit()
+            qr = QuantumRegister(op.num_qubits)
+            dag.add_qreg(qr)
+            dag.apply_operation_back(Gate(op.name, op.num_qubits, params), qr[:], [])
+            translation = (params, super().run(dag))
+            with self._lock:
+                translation = self._translations.setdefault(key, translation)
+        return translation
@@ -4,11 +4,15 @@ from qiskit.providers.basebackend import BaseBackend
 from qiskit.providers.jobstatus import JobStatus
 from qiskit import Aer
 from qiskit.utils import QuantumInstance
-from .frontend import jaqal_circuit_from_qiskit_circuit, ion_pass_manager
+from .frontend import jaqal_circuit_from_qiskit_circuit, _ion_passes
+from .cache import TranspileCache, circuit_fingerprint
 from qiskit.transpiler import PassManager
-from jaqalpaq.emulator import run_jaqal_circuit
+from jaqalpaq.emulator import run_jaqal_circuit, UnitarySerializedEmulator
+from jaqalpaq.error import JaqalError
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import repeat
+import weakref
 import numpy as np
-from collections import Counter
 
 
 class IonResult:
@@ -34,44 +38,179 @@ class IonInstance(QuantumInstance):
         native_gates=None,
         param_maps=None,
         jaqal_backend=None,
+        seed=None,
+        workers=None,
+        executor="thread",
+        transpile_cache=None,
         **kwargs,
     ):
         super().__init__(backend, **kwargs)
+        if executor not in ("thread", "process"):
+            raise JaqalError(f"Unknown executor {executor}")
+        #: The random number generator shots are sampled with.
+        self.rng = np.random.default_rng(seed)
+        #: The backend circuits are emulated with. The default is created once here, so
+        #: that every execution reuses it.
+        self.jaqal_backend = (
+            UnitarySerializedEmulator() if jaqal_backend is None else jaqal_backend
+        )
+        self.workers = workers
+        self.executor = executor
+        # Started the first time it's needed, then reused by every later execution.
+        self._pool = None
+        # Shuts the pool down if the instance is discarded without being closed.
+        self._finalizer = None
+        self._pass_manager = PassManager(_ion_passes())
+        #: Remembers the circuits this instance has transpiled.
+        self.transpile_cache = (
+            TranspileCache() if transpile_cache is None else transpile_cache
+        )
         self.transpiler_args = {
             "names": names,
             "native_gates": native_gates,
             "param_maps": param_maps,
         }
+        # Distinguishes this instance's conversions from those of instances with other
+        # settings that share its cache.
+        self._conversion_key = tuple(
+            None if arg is None else frozenset(_hashable_items(arg))
+            for arg in (names, native_gates, param_maps)
+        )
 
     def transpile(self, circuits, pass_manager=None):
-        if isinstance(circuits, list):
-            ipm = ion_pass_manager()
-            return [ipm.run(circuit.decompose()) for circuit in circuits]
-        else:
-            return [ion_pass_manager().run(circuits.decompose())]
+        if not isinstance(circuits, list):
+            circuits = [circuits]
+        # The cached circuit may have been transpiled from one with another name, and
+        # shouldn't be changed by whoever it's returned to.
+        return [
+            self._transpiled(circuit, True)[1][0].copy(name=circuit.name)
+            for circuit in circuits
+        ]
 
     def execute(self, circuits, had_transpiled=False):
-        if not had_transpiled:
-            circuits = self.transpile(circuits)
+        if not had_transpiled and not isinstance(circuits, list):
+            circuits = [circuits]
+        jcircuits = [
+            self._jaqal_circuit(circuit, not had_transpiled) for circuit in circuits
+        ]
         counts = {}
-        for circuit in circuits:
-            jcircuit = jaqal_circuit_from_qiskit_circuit(
-                circuit, **self.transpiler_args
+        # Shots are sampled here, in order, so a seeded instance gives the same counts
+        # however the circuits were emulated.
+        for circuit, probs in zip(circuits, self._emulate(jcircuits)):
+            counts[circuit.name] = _sample_counts(
+                probs, self._run_config.shots, len(circuit.qubits), self.rng
             )
-            results = run_jaqal_circuit(jcircuit)
-            probs = np.array(results.subcircuits[0].probability_by_int)
-            qubits = len(circuit.qubits)
-            shots = [
-                f"{np.random.choice(2 ** qubits, p=probs):b}".zfill(qubits)
-                for shot in range(self._run_config.shots)
-            ]
-            counts[circuit.name] = dict(Counter(shots))
         # job = IonJob(self.backend, "")
         # job._result = IonResult(statevectors)
         return IonResult(counts)
 
+    def _transpiled(self, circuit, unroll):
+        """Returns the key circuit is cached under, and its entry: a list of circuit
+        unrolled, if unroll is true, and its Jaqal conversion, if it's been made yet."""
+        key = (unroll, self._conversion_key, circuit_fingerprint(circuit))
+        entry = self.transpile_cache.get(key)
+        if entry is None:
+            unrolled = self._pass_manager.run(circuit.decompose()) if unroll else None
+            entry = [unrolled, None]
+            self.transpile_cache.put(key, entry)
+        return key, entry
+
+    def _jaqal_circuit(self, circuit, unroll):
+        """Returns circuit converted to Jaqal, after unrolling it if unroll is true,
+        using the transpile cache if possible."""
+        key, entry = self._transpiled(circuit, unroll)
+        if entry[1] is None:
+            # Circuits are only converted when they're executed, as they may have
+            # unbound parameters until then.
+            entry[1] = jaqal_circuit_from_qiskit_circuit(
+                entry[0] if unroll else circuit, **self.transpiler_args
+            )
+            # Storing it again accounts for the size of the conversion.
+            self.transpile_cache.put(key, entry)
+        return entry[1]
+
+    def _emulate(self, jcircuits):
+        """Returns the outcome probabilities of each of jcircuits, in order."""
+        if self.workers is None or len(jcircuits) < 2:
+            return [
+                _probabilities(jcircuit, self.jaqal_backend) for jcircuit in jcircuits
+            ]
+        if self._pool is None:
+            if self.executor == "thread":
+                self._pool = ThreadPoolExecutor(max_workers=self.workers)
+            else:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            # The finalizer only refers to the pool, so it doesn't keep the instance
+            # alive.
+            self._finalizer = weakref.finalize(self, self._pool.shutdown)
+        return list(
+            self._pool.map(_probabilities, jcircuits, repeat(self.jaqal_backend))
+        )
+
+    def close(self):
+        """Shuts down any workers started to emulate circuits. The instance may still be
+        used afterwards, and will start new ones if needed."""
+        if self._pool is not None:
+            self._finalizer()
+            self._finalizer = None
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _probabilities(jcircuit, backend):
+    """Emulates jcircuit with backend, returning the probability of each outcome of its
+    first subcircuit, indexed by the integer its bitstring represents."""
+    results = run_jaqal_circuit(jcircuit, backend=backend)
+    return np.array(results.subcircuits[0].probability_by_int)
 
-def get_ion_instance(jaqal_backend=None):
+
+def _hashable_items(mapping):
+    """Returns the items of mapping, with any value that can't be hashed, such as a gate
+    definition, replaced by its identity."""
+    for key, value in mapping.items():
+        try:
+            hash(value)
+        except TypeError:
+            value = id(value)
+        yield key, value
+
+
+def _sample_counts(probs, shots, qubits, rng):
+    """
+    Samples measurement outcomes in a single draw, rather than shot by shot.
+
+    :param numpy.ndarray probs: The probability of each outcome, indexed by the integer
+        its bitstring represents.
+    :param int shots: How many shots to sample.
+    :param int qubits: How many qubits were measured.
+    :param numpy.random.Generator rng: The random number generator to sample with.
+    :returns: How many times each outcome that occurred at least once was measured,
+        keyed by its bitstring.
+    :rtype: dict
+    """
+    # The emulator's probabilities may stray from summing to exactly one by rounding
+    # error, which the multinomial distribution won't accept.
+    probs = np.clip(probs, 0, None)
+    probs /= probs.sum()
+    tally = rng.multinomial(shots, probs)
+    return {
+        f"{outcome:0{qubits}b}": int(tally[outcome])
+        for outcome in np.flatnonzero(tally)
+    }
+
+
+def get_ion_instance(
+    jaqal_backend=None,
+    seed=None,
+    workers=None,
+    executor="thread",
+    transpile_cache=None,
+):
     """
     Creates a `qiskit.utils.QuantumInstance` representing the Jaqal emulator backend. Pass it
     to a Qiskit Aqua algorithm or use it to transpile and emulate circuits directly with
@@ -84,11 +223,41 @@ def get_ion_instance(jaqal_backend=None):
         in addition to those provided by a `qiskit.utils.QuantumInstance`, are internal
         implementation details and should not be relied on.
 
+    If `workers` is given, each list of circuits passed to `execute` is emulated
+    concurrently by that many workers, which are started the first time they're needed
+    and kept for later calls. With the "thread" executor they share `jaqal_backend`; with
+    the "process" executor it's sent along with each circuit, so the backend and the
+    circuits must be picklable. Either way, the counts are the same as if the circuits
+    had been emulated one after another. The workers are shut down by the instance's
+    `close` method, on leaving a `with` block it's used in, or when it's discarded.
+
+    Circuits are transpiled and converted to Jaqal only the first time a circuit with
+    their structure is seen; see :class:`TranspileCache`. The cache is kept as the
+    `transpile_cache` attribute of the returned instance, whose `hits` and `misses`
+    count how often it was used.
+
     :param jaqal_backend: Pass a backend instance to use. If omitted, instantiates a new
         :class:`jaqalpaq.emulator.UnitarySerializedEmulator`, which in practice should
         usually be the desired usage.
     :type jaqal_backend: :class:`jaqalpaq.emulator.AbstractBackend` or None
+    :param seed: Seeds the random number generator measurement outcomes are sampled
+        with, so that results are reproducible. If omitted, they differ from run to run.
+    :type seed: int or None
+    :param workers: If given, the number of workers to emulate circuits with.
+    :type workers: int or None
+    :param str executor: Either "thread" or "process".
+    :param transpile_cache: The cache of transpiled circuits to use. If omitted, a new
+        :class:`TranspileCache` is created with its default limits.
+    :type transpile_cache: TranspileCache or None
     :returns: A Qiskit representation of the Jaqal emulator.
     :rtype: `qiskit.utils.QuantumInstance`
+    :raises JaqalError: If the executor isn't recognized.
     """
-    return IonInstance(Aer.get_backend("qasm_simulator"), jaqal_backend=jaqal_backend)
+    return IonInstance(
+        Aer.get_backend("qasm_simulator"),
+        jaqal_backend=jaqal_backend,
+        seed=seed,
+        workers=workers,
+        executor=executor,
+        transpile_cache=transpile_cache,
+    )
@@ -0,0 +1,168 @@
+# Copyright 2020 National Technology & Engineering Solutions of Sandia, LLC (NTESS).
+# Under the terms of Contract DE-NA0003525 with NTESS, the U.S. Government retains
+# certain rights in this software.
+from collections.abc import Mapping
+
+import numpy as np
+from qiskit.circuit import ParameterExpression
+
+from jaqalpaq.core.algorithm.fill_in_let import fill_in_let
+from jaqalpaq.error import JaqalError
+from jaqalpaq.scheduler import schedule_circuit
+
+
+class JaqalTemplate:
+    """
+    A Jaqal circuit converted from a parameterized Qiskit circuit by
+    :func:`jaqal_template_from_qiskit_circuit`. Each distinct gate angle that depends on
+    the Qiskit circuit's parameters is a let constant, so binding values to those
+    parameters only fills in the constants, without unrolling or converting the circuit
+    again.
+
+    Angles that are affine in the parameters, as most are, are computed with a single
+    matrix product for a whole batch of values; any others are evaluated by Qiskit.
+    """
+
+    def __init__(self, circuit, slots, parameters):
+        """
+        :param jaqalpaq.core.Circuit circuit: The circuit, with a let constant for each
+            angle in `slots`.
+        :param dict slots: Maps the name of each let constant to the
+            `qiskit.circuit.ParameterExpression` it stands for.
+        :param parameters: The parameters values are bound to.
+        :type parameters: list(qiskit.circuit.Parameter)
+        """
+        #: The circuit, with a let constant for each angle in `slots`.
+        self.circuit = circuit
+        #: Maps the name of each let constant to the expression it stands for.
+        self.slots = slots
+        #: The parameters values are bound to, in the order they're given to
+        #: :meth:`bind` as a sequence.
+        self.parameters = list(parameters)
+
+        index = {parameter: idx for idx, parameter in enumerate(self.parameters)}
+        self._names = list(slots)
+        self._offsets = np.zeros(len(slots))
+        self._coefficients = np.zeros((len(self.parameters), len(slots)))
+        self._nonlinear = []
+        for slot, expression in enumerate(slots.values()):
+            coefficients = _affine_coefficients(expression)
+            if coefficients is None:
+                self._nonlinear.append(slot)
+                continue
+            offset, gradients = coefficients
+            self._offsets[slot] = offset
+            for parameter, gradient in gradients.items():
+                self._coefficients[index[parameter], slot] = gradient
+
+    def angles(self, batch):
+        """
+        Computes the value of every let constant for each set of values in batch.
+
+        :param batch: The values to bind, each either a dict mapping parameters to
+            values, or a sequence of values in the order of :attr:`parameters`.
+        :type batch: iterable(dict or list(float))
+        :returns: A dict mapping each let constant's name to its value, for each set of
+            values in batch.
+        :rtype: list(dict)
+        :raises JaqalError: If a value isn't given for every parameter.
+        """
+        vectors = [self._vector(vector) for vector in batch]
+        # Built row by row so that a template without parameters still gets a row for
+        # each set of values.
+        values = np.zeros((len(vectors), len(self.parameters)))
+        for row, vector in zip(values, vectors):
+            row[:] = vector
+        angles = values @ self._coefficients + self._offsets
+        for slot in self._nonlinear:
+            expression = self.slots[self._names[slot]]
+            for row, vector in zip(angles, values):
+                row[slot] = float(
+                    expression.bind(
+                        {
+                            parameter: value
+                            for parameter, value in zip(self.parameters, vector)
+                            if parameter in expression.parameters
+                        }
+                    )
+                )
+        return [dict(zip(self._names, row.tolist())) for row in angles]
+
+    def bind(self, values):
+        """
+        Returns the circuit, with values bound to its parameters.
+
+        :param values: Either a dict mapping parameters to values, or a sequence of
+            values in the order of :attr:`parameters`.
+        :type values: dict or list(float)
+        :returns: A circuit with every angle filled in.
+        :rtype: jaqalpaq.core.Circuit
+        :raises JaqalError: If a value isn't given for every parameter.
+        """
+        return self.bind_batch([values])[0]
+
+    def bind_batch(self, batch):
+        """
+        Returns a copy of the circuit for each set of values in batch, as :meth:`bind`
+        would.
+
+        :param batch: The values to bind.
+        :type batch: iterable(dict or list(float))
+        :returns: A circuit for each set of values, in order.
+        :rtype: list(jaqalpaq.core.Circuit)
+        :raises JaqalError: If a value isn't given for every parameter.
+        """
+        return [fill_in_let(self.circuit, angles) for angles in self.angles(batch)]
+
+    def schedule(self, **kwargs):
+        """
+        Schedules the circuit once, so that every circuit bound from it afterwards is
+        already scheduled.
+
+        :param kwargs: Passed to :func:`jaqalpaq.scheduler.schedule_circuit`.
+        :returns: A template with the scheduled circuit.
+        :rtype: JaqalTemplate
+        """
+        return JaqalTemplate(
+            schedule_circuit(self.circuit, **kwargs), self.slots, self.parameters
+        )
+
+    def _vector(self, values):
+        """Returns values as a list in the order of :attr:`parameters`."""
+        if isinstance(values, Mapping):
+            unknown = set(values) - set(self.parameters)
+            if unknown:
+                raise JaqalError(
+                    "Values given for parameters not in the template: %s"
+                    % ", ".join(sorted(str(parameter) for parameter in unknown))
+                )
+            try:
+                return [values[parameter] for parameter in self.parameters]
+            except KeyError as exc:
+                raise JaqalError(f"No value given for parameter {exc.args[0]}")
+        values = list(values)
+        if len(values) != len(self.parameters):
+            raise JaqalError(
+                f"Expected {len(self.parameters)} values, one for each parameter, "
+                f"but got {len(values)}"
+            )
+        return values
+
+
+def _affine_coefficients(expression):
+    """Returns the constant term of expression, and a dict mapping each of its
+    parameters to its coefficient, or None if expression isn't affine in them."""
+    gradients = {}
+    for parameter in expression.parameters:
+        gradient = expression.gradient(parameter)
+        if isinstance(gradient, ParameterExpression):
+            if gradient.parameters:
+                return None
+            gradient = float(gradient)
+        if isinstance(gradient, complex):
+            if gradient.imag:
+                return None
+            gradient = gradient.real
+        gradients[parameter] = gradient
+    offset = float(expression.bind({parameter: 0 for parameter in gradients}))
+    return offset, gradients
@@ -0,0 +1,81 @@
+import unittest, pytest
+import jaqalpaq
+from jaqalpaq.core.circuitbuilder import build
+from jaqalpaq.scheduler import schedule_circuit, ScheduleCache
+
+qscout = pytest.importorskip("qscout")
+from qscout.v1.std.jaqal_gates import ALL_GATES as native_gates
+
+
+def ramsey(angle, target=1):
+    return build(
+        (
+            "circuit",
+            ("register", "q", 3),
+            (
+                "unscheduled_block",
+                ("gate", "prepare_all"),
+                ("gate", "Sx", ("array_item", "q", 0)),
+                ("gate", "Rz", ("array_item", "q", 0), angle),
+                ("gate", "Px", ("array_item", "q", target)),
+                (
+                    "sequential_block",
+                    ("gate", "Sy", ("array_item", "q", 2)),
+                    ("gate", "Rz", ("array_item", "q", target), angle),
+                ),
+                (
+                    "gate",
+                    "MS",
+                    ("array_item", "q", 0),
+                    ("array_item", "q", 2),
+                    0,
+                    angle,
+                ),
+                ("gate", "Sxd", ("array_item", "q", 0)),
+                ("gate", "measure_all"),
+            ),
+        ),
+        native_gates,
+    )
+
+
+class CacheTester(unittest.TestCase):
+    def test_sweep(self):
+        cache = ScheduleCache()
+        for angle in [0.0, 0.5, 1.0, 1.5]:
+            circ = ramsey(angle)
+            self.assertEqual(
+                schedule_circuit(circ, cache=cache), schedule_circuit(circ)
+            )
+        self.assertEqual(cache.misses, 1)
+        self.assertEqual(cache.hits, 3)
+        self.assertEqual(len(cache), 1)
+
+    def test_qubits_change_key(self):
+        cache = ScheduleCache()
+        for target in [1, 2]:
+            circ = ramsey(0.5, target)
+            self.assertEqual(
+                schedule_circuit(circ, cache=cache), schedule_circuit(circ)
+            )
+        self.assertEqual(cache.misses, 2)
+        self.assertEqual(cache.hits, 0)
+
+    def test_lru(self):
+        cache = ScheduleCache(maxsize=1)
+        schedule_circuit(ramsey(0.5, 1), cache=cache)
+        schedule_circuit(ramsey(0.5, 2), cache=cache)
+        schedule_circuit(ramsey(0.5, 1), cache=cache)
+        self.assertEqual(cache.misses, 3)
+        self.assertEqual(len(cache), 1)
+        cache.clear()
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 0, 0))
+
+    def test_workers(self):
+        cache = ScheduleCache()
+        for angle in [0.0, 0.5]:
+            circ = ramsey(angle)
+            self.assertEqual(
+                schedule_circuit(circ, workers=2, cache=cache), schedule_circuit(circ)
+            )
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
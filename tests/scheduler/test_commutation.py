@@ -0,0 +1,95 @@
+import unittest, pytest
+from math import pi
+import jaqalpaq
+from jaqalpaq.core.circuitbuilder import build
+from jaqalpaq.scheduler import schedule_circuit
+from jaqalpaq.scheduler.commutation import QSCOUT_AXES, Z_AXIS, gate_axis
+
+qscout = pytest.importorskip("qscout")
+np = pytest.importorskip("numpy")
+from qscout.v1.std.jaqal_gates import ALL_GATES as native_gates
+from qscout.v1.std.jaqal_action import IDEAL_ACTION
+
+
+def circuit(*gates):
+    return build(
+        ("circuit", ("register", "q", 3), ("unscheduled_block", *gates)),
+        native_gates,
+    )
+
+
+def qubit(idx):
+    return ("array_item", "q", idx)
+
+
+class CommutationTester(unittest.TestCase):
+    def test_single_qubit_axes(self):
+        # Every pair of single-qubit gates with the same axis must commute, and in this
+        # sample, every pair with different axes doesn't.
+        gates = [("R", 0.3, 1.1), ("R", 0.3 + pi, 0.4), ("R", pi / 2, 0.5)]
+        gates += [("Rx", 0.2), ("Ry", 0.2), ("Rz", 0.2)]
+        gates += [(name,) for name in ["Px", "Py", "Pz", "Sx", "Sy", "Sz", "Sxd"]]
+        statements = circuit(
+            *[("gate", gate[0], qubit(0), *gate[1:]) for gate in gates]
+        ).body.statements[0]
+        for first, first_gate in zip(gates, statements):
+            for second, second_gate in zip(gates, statements):
+                a = IDEAL_ACTION[first[0]](*first[1:])
+                b = IDEAL_ACTION[second[0]](*second[1:])
+                commutes = np.allclose(a @ b, b @ a)
+                same_axis = gate_axis(first_gate) == gate_axis(second_gate)
+                self.assertEqual(commutes, same_axis, (first, second))
+
+    def test_axis_table(self):
+        # X, Y, and Z rotations of every angle share their axis, and the angle-dependent
+        # gates name the parameter their axis is read from.
+        for names in [("Px", "Sx", "Sxd", "Rx"), ("Py", "Sy", "Syd", "Ry")]:
+            self.assertEqual(
+                {QSCOUT_AXES[name] for name in names}, {QSCOUT_AXES[names[0]]}
+            )
+        self.assertEqual(QSCOUT_AXES["Sx"], 0.0)
+        self.assertAlmostEqual(QSCOUT_AXES["Py"], pi / 2)
+        for name in ("Pz", "Sz", "Szd", "Rz"):
+            self.assertEqual(QSCOUT_AXES[name], Z_AXIS)
+        self.assertEqual(QSCOUT_AXES["Sxx"], QSCOUT_AXES["Px"])
+        self.assertEqual(QSCOUT_AXES["R"], "axis-angle")
+        self.assertEqual(QSCOUT_AXES["MS"], "axis-angle")
+        for name, axis in QSCOUT_AXES.items():
+            self.assertIn(name, native_gates)
+            if not isinstance(axis, str):
+                self.assertTrue(axis == Z_AXIS or 0 <= axis < pi, name)
+
+    def test_ms_axes(self):
+        ms = np.kron(IDEAL_ACTION["MS"](0.3, 0.7), np.eye(2))
+        r = np.kron(IDEAL_ACTION["R"](0.3, 1.1), np.eye(4))
+        self.assertTrue(np.allclose(ms @ r, r @ ms))
+        statements = circuit(
+            ("gate", "MS", qubit(0), qubit(1), 0.3, 0.7),
+            ("gate", "R", qubit(0), 0.3, 1.1),
+            ("gate", "Sxx", qubit(0), qubit(1)),
+            ("gate", "Px", qubit(0)),
+        ).body.statements[0]
+        axes = [gate_axis(gate) for gate in statements]
+        self.assertEqual(axes[0], axes[1])
+        self.assertEqual(axes[2], axes[3])
+        self.assertIsNone(gate_axis(circuit(("gate", "prepare_all")).body[0][0]))
+
+    def test_reorder(self):
+        circ = circuit(
+            ("gate", "Sx", qubit(0)),
+            ("gate", "Sxx", qubit(0), qubit(1)),
+            ("gate", "Sx", qubit(1)),
+        )
+        self.assertEqual(len(schedule_circuit(circ).body.statements[0].statements), 3)
+        first, second = schedule_circuit(circ, commute=True).body.statements[0]
+        self.assertTrue(first.parallel)
+        self.assertEqual([gate.name for gate in first], ["Sx", "Sx"])
+        self.assertEqual(second.name, "Sxx")
+
+    def test_no_reorder(self):
+        circ = circuit(
+            ("gate", "Sx", qubit(0)),
+            ("gate", "Sxx", qubit(0), qubit(1)),
+            ("gate", "Sy", qubit(1)),
+        )
+        self.assertEqual(schedule_circuit(circ, commute=True), schedule_circuit(circ))
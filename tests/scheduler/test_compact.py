@@ -0,0 +1,124 @@
+import unittest, pytest
+import jaqalpaq
+from jaqalpaq.core.circuitbuilder import build
+from jaqalpaq.scheduler import compact_schedule
+
+qscout = pytest.importorskip("qscout")
+from qscout.v1.std.jaqal_gates import ALL_GATES as native_gates
+
+
+def qubit(idx):
+    return ("array_item", "q", idx)
+
+
+class CompactTester(unittest.TestCase):
+    def run_test(self, uncompacted, compacted):
+        self.assertEqual(
+            build(compacted, native_gates),
+            compact_schedule(build(uncompacted, native_gates)),
+        )
+
+    def test_merge_moments(self):
+        # The form produced by moment-based frontends: gates and parallel blocks at the
+        # top level of the circuit.
+        self.run_test(
+            (
+                "circuit",
+                ("register", "q", 3),
+                ("gate", "prepare_all"),
+                ("parallel_block", ("gate", "Sx", qubit(0)), ("gate", "Sx", qubit(1))),
+                ("gate", "Sy", qubit(2)),
+                ("parallel_block", ("gate", "Px", qubit(0))),
+                ("gate", "MS", qubit(0), qubit(1), 0, 1.5),
+                ("gate", "Pz", qubit(2)),
+                ("gate", "Sy", qubit(2)),
+                ("gate", "measure_all"),
+            ),
+            (
+                "circuit",
+                ("register", "q", 3),
+                ("gate", "prepare_all"),
+                (
+                    "parallel_block",
+                    ("gate", "Sx", qubit(0)),
+                    ("gate", "Sx", qubit(1)),
+                    ("gate", "Sy", qubit(2)),
+                ),
+                ("parallel_block", ("gate", "Px", qubit(0))),
+                ("gate", "MS", qubit(0), qubit(1), 0, 1.5),
+                ("gate", "Pz", qubit(2)),
+                ("gate", "Sy", qubit(2)),
+                ("gate", "measure_all"),
+            ),
+        )
+
+    def test_nested(self):
+        self.run_test(
+            (
+                "circuit",
+                ("register", "q", 2),
+                (
+                    "sequential_block",
+                    ("gate", "Px", qubit(0)),
+                    ("gate", "Py", qubit(1)),
+                    (
+                        "loop",
+                        2,
+                        (
+                            "sequential_block",
+                            ("gate", "Sx", qubit(0)),
+                            ("gate", "Sy", qubit(1)),
+                        ),
+                    ),
+                    ("gate", "Pz", qubit(1)),
+                    (
+                        "unscheduled_block",
+                        ("gate", "Sx", qubit(0)),
+                        ("gate", "Sy", qubit(1)),
+                    ),
+                ),
+            ),
+            (
+                "circuit",
+                ("register", "q", 2),
+                (
+                    "sequential_block",
+                    (
+                        "parallel_block",
+                        ("gate", "Px", qubit(0)),
+                        ("gate", "Py", qubit(1)),
+                    ),
+                    (
+                        "loop",
+                        2,
+                        (
+                            "sequential_block",
+                            (
+                                "parallel_block",
+                                ("gate", "Sx", qubit(0)),
+                                ("gate", "Sy", qubit(1)),
+                            ),
+                        ),
+                    ),
+                    ("gate", "Pz", qubit(1)),
+                    (
+                        "unscheduled_block",
+                        ("gate", "Sx", qubit(0)),
+                        ("gate", "Sy", qubit(1)),
+                    ),
+                ),
+            ),
+        )
+
+    def test_already_compact(self):
+        circuit = (
+            "circuit",
+            ("register", "q", 2),
+            ("gate", "prepare_all"),
+            ("parallel_block", ("gate", "Sx", qubit(0)), ("gate", "Sx", qubit(1))),
+            ("gate", "Sxx", qubit(0), qubit(1)),
+            ("gate", "Sy", qubit(0)),
+            ("gate", "Sy", qubit(0)),
+            ("gate", "measure_all"),
+        )
+        self.run_test(circuit, circuit)
@@ -0,0 +1,111 @@
+import unittest, pytest
+from unittest import mock
+import jaqalpaq
+from jaqalpaq.core.circuitbuilder import build
+from jaqalpaq.parser import parse_jaqal_string
+from jaqalpaq.scheduler import constraints
+from jaqalpaq.scheduler import schedule_circuit, ConstraintTable
+from jaqalpaq.scheduler.constraints import (
+    EXCLUSIVE,
+    PARALLEL,
+    BARRIER,
+    classify_gate,
+    constraint_table,
+)
+
+qscout = pytest.importorskip("qscout")
+from qscout.v1.std.jaqal_gates import ALL_GATES as native_gates
+
+
+def classify_with_ms(gate_def):
+    # Hypothetical hardware where one MS gate can run alongside single-qubit gates.
+    if gate_def.name == "MS":
+        return 3
+    return classify_gate(gate_def)
+
+
+class ConstraintTester(unittest.TestCase):
+    unscheduled = (
+        "circuit",
+        ("register", "q", 3),
+        (
+            "unscheduled_block",
+            ("gate", "Px", ("array_item", "q", 0)),
+            ("gate", "MS", ("array_item", "q", 1), ("array_item", "q", 2), 0, 0),
+        ),
+    )
+
+    def test_qscout_classes(self):
+        table = constraint_table(native_gates)
+        self.assertIs(table, constraint_table(native_gates))
+        self.assertEqual(table.gate_class("Px"), PARALLEL)
+        self.assertEqual(table.gate_class("MS"), EXCLUSIVE)
+        self.assertEqual(table.gate_class("prepare_all"), BARRIER)
+        self.assertEqual(table.gate_class("not_a_gate"), EXCLUSIVE)
+        self.assertEqual(table.accepts[PARALLEL], 1 << PARALLEL)
+        self.assertEqual(table.accepts[EXCLUSIVE], 0)
+        self.assertEqual(table.accepts[BARRIER], 0)
+
+    def test_shared_table(self):
+        # Every parsed circuit has its own copy of the native gates, but they share the
+        # same definitions, and so the same table.
+        table = constraint_table(native_gates)
+        tables = len(constraints._tables)
+        with mock.patch.object(
+            constraints, "ConstraintTable", side_effect=AssertionError
+        ):
+            for _ in range(50):
+                circ = parse_jaqal_string(
+                    "register q[2]\n{ Px q[0]; MS q[0] q[1] 0 0 }",
+                    inject_pulses=native_gates,
+                )
+                self.assertIsNot(circ.native_gates, native_gates)
+                self.assertIs(constraint_table(circ.native_gates), table)
+                schedule_circuit(circ)
+        self.assertEqual(len(constraints._tables), tables)
+
+    def test_default_rules(self):
+        circ = schedule_circuit(build(self.unscheduled, native_gates))
+        self.assertEqual(len(circ.body.statements[0].statements), 2)
+
+    def test_custom_rules(self):
+        table = ConstraintTable(
+            native_gates, classify_with_ms, [(PARALLEL, PARALLEL), (PARALLEL, 3)]
+        )
+        self.assertEqual(table.accepts[3], 1 << PARALLEL)
+        circ = schedule_circuit(
+            build(self.unscheduled, native_gates), constraints=table
+        )
+        (moment,) = circ.body.statements[0].statements
+        self.assertTrue(moment.parallel)
+        self.assertEqual([gate.name for gate in moment], ["Px", "MS"])
+
+    def test_limits(self):
+        gates = [("gate", "Px", ("array_item", "q", idx)) for idx in range(5)]
+        circuit = ("circuit", ("register", "q", 5), ("unscheduled_block", *gates))
+        table = ConstraintTable(native_gates, limits={None: 2})
+        circ = schedule_circuit(build(circuit, native_gates), constraints=table)
+        moments = circ.body.statements[0].statements
+        self.assertEqual(
+            [len(getattr(moment, "statements", [moment])) for moment in moments],
+            [2, 2, 1],
+        )
+
+    def test_class_limits(self):
+        table = ConstraintTable(
+            native_gates,
+            classify_with_ms,
+            [(PARALLEL, PARALLEL), (PARALLEL, 3)],
+            limits={3: 1},
+        )
+        self.assertTrue(table.fits(table.usage[3], table.usage[PARALLEL]))
+        self.assertFalse(table.fits(table.usage[3], table.usage[3]))
+        circ = schedule_circuit(
+            build(self.unscheduled, native_gates), constraints=table
+        )
+        (moment,) = circ.body.statements[0].statements
+        self.assertEqual([gate.name for gate in moment], ["Px", "MS"])
+
+    def test_bad_limit(self):
+        with self.assertRaises(jaqalpaq.error.JaqalError):
+            ConstraintTable(native_gates, limits={PARALLEL: 0})
@@ -0,0 +1,113 @@
+import unittest, pytest
+import jaqalpaq
+from jaqalpaq.core.circuitbuilder import build
+from jaqalpaq.error import JaqalError
+from jaqalpaq.scheduler import schedule_circuit, circuit_duration
+from jaqalpaq.scheduler.durations import statement_duration
+
+qscout = pytest.importorskip("qscout")
+from qscout.v1.std.jaqal_gates import ALL_GATES as native_gates
+
+
+def ms_duration(gate):
+    return 20 * abs(float(gate.parameters_by_name["rotation-angle"]))
+
+
+durations = {
+    "prepare_all": 50,
+    "measure_all": 80,
+    "Px": 10,
+    "Pz": 1,
+    "MS": ms_duration,
+}
+
+
+class DurationTester(unittest.TestCase):
+    def test_statement_duration(self):
+        circ = build(
+            (
+                "circuit",
+                ("register", "q", 2),
+                (
+                    "macro",
+                    "H",
+                    "a",
+                    ("sequential_block", ("gate", "Px", "a"), ("gate", "Pz", "a")),
+                ),
+                ("gate", "prepare_all"),
+                (
+                    "parallel_block",
+                    ("gate", "Px", ("array_item", "q", 0)),
+                    ("gate", "Pz", ("array_item", "q", 1)),
+                ),
+                ("gate", "MS", ("array_item", "q", 0), ("array_item", "q", 1), 0, 0.5),
+                ("gate", "H", ("array_item", "q", 1)),
+                (
+                    "loop",
+                    3,
+                    ("sequential_block", ("gate", "Pz", ("array_item", "q", 0))),
+                ),
+                ("gate", "measure_all"),
+            ),
+            native_gates,
+        )
+        self.assertEqual(
+            [statement_duration(instr, durations) for instr in circ.body],
+            [50, 10, 10, 11, 3, 80],
+        )
+        self.assertEqual(circuit_duration(circ, durations), 164)
+        with self.assertRaises(JaqalError):
+            circuit_duration(circ, {"Px": 1})
+
+    def test_critical_path(self):
+        # Scheduling as soon as possible puts the first Pz in a moment by itself, but
+        # it can wait and share one with the second.
+        circ = build(
+            (
+                "circuit",
+                ("register", "q", 3),
+                (
+                    "unscheduled_block",
+                    ("gate", "Pz", ("array_item", "q", 0)),
+                    (
+                        "gate",
+                        "MS",
+                        ("array_item", "q", 2),
+                        ("array_item", "q", 1),
+                        0,
+                        1,
+                    ),
+                    ("gate", "Pz", ("array_item", "q", 1)),
+                ),
+            ),
+            native_gates,
+        )
+        self.assertEqual(circuit_duration(schedule_circuit(circ), durations), 22)
+        scheduled = schedule_circuit(circ, durations=durations)
+        self.assertEqual(circuit_duration(scheduled, durations), 21)
+        first, second = scheduled.body.statements[0].statements
+        self.assertEqual(first.name, "MS")
+        self.assertEqual([gate.name for gate in second], ["Pz", "Pz"])
+        self.assertEqual(
+            scheduled,
+            schedule_circuit(circ, workers=2, durations=durations),
+        )
+
+    def test_never_worse(self):
+        circ = build(
+            (
+                "circuit",
+                ("register", "q", 2),
+                (
+                    "unscheduled_block",
+                    ("gate", "prepare_all"),
+                    ("gate", "Px", ("array_item", "q", 0)),
+                    ("gate", "Pz", ("array_item", "q", 1)),
+                    ("gate", "measure_all"),
+                ),
+            ),
+            native_gates,
+        )
+        self.assertEqual(
+            schedule_circuit(circ, durations=durations), schedule_circuit(circ)
+        )
@@ -0,0 +1,122 @@
+import unittest, pytest
+import jaqalpaq
+from jaqalpaq.core.circuitbuilder import build
+from jaqalpaq.core.algorithm import expand_macros
+from jaqalpaq.scheduler import schedule_circuit, circuit_duration, estimate_schedule
+
+qscout = pytest.importorskip("qscout")
+from qscout.v1.std.jaqal_gates import ALL_GATES as native_gates
+
+
+def qubit(idx):
+    return ("array_item", "q", idx)
+
+
+durations = {"prepare_all": 50, "measure_all": 80, "Px": 10, "Pz": 1, "MS": 100}
+
+
+class EstimateTester(unittest.TestCase):
+    def setUp(self):
+        self.circ = build(
+            (
+                "circuit",
+                ("register", "q", 3),
+                (
+                    "unscheduled_block",
+                    ("gate", "prepare_all"),
+                    ("gate", "Px", qubit(0)),
+                    ("gate", "Px", qubit(1)),
+                    ("gate", "MS", qubit(0), qubit(1), 0, 0),
+                    ("loop", 3, ("sequential_block", ("gate", "Pz", qubit(2)))),
+                    ("gate", "measure_all"),
+                ),
+            ),
+            native_gates,
+        )
+
+    def test_estimate(self):
+        estimate = estimate_schedule(self.circ)
+        scheduled = schedule_circuit(self.circ)
+        moments = scheduled.body.statements[0].statements
+        self.assertEqual(estimate.moments, len(moments) + 2)
+        self.assertEqual(estimate.critical_path, 5)
+        self.assertIsNone(estimate.duration)
+        self.assertEqual(estimate.gate_counts["MS"], 1)
+        self.assertEqual(estimate.gate_counts["Px"], 2)
+        self.assertEqual(estimate.gate_counts["Pz"], 3)
+
+    def test_scheduled(self):
+        # Estimating an already scheduled circuit counts it as it is, so its moments all
+        # lie on the critical path.
+        estimate = estimate_schedule(self.circ)
+        rescheduled = estimate_schedule(schedule_circuit(self.circ))
+        self.assertEqual(rescheduled.moments, estimate.moments)
+        self.assertEqual(rescheduled.critical_path, estimate.moments)
+        self.assertEqual(rescheduled.gate_counts, estimate.gate_counts)
+
+    def test_duration(self):
+        estimate = estimate_schedule(self.circ, durations)
+        scheduled = schedule_circuit(self.circ, durations=durations)
+        self.assertEqual(estimate.duration, circuit_duration(scheduled, durations))
+
+    def test_macro(self):
+        # A call executes the macro's body, though it's placed as a whole.
+        circ = build(
+            (
+                "circuit",
+                ("register", "q", 3),
+                (
+                    "macro",
+                    "Entangle",
+                    "a",
+                    "b",
+                    (
+                        "sequential_block",
+                        ("gate", "Sy", "a"),
+                        ("gate", "MS", "a", "b", 0, 0),
+                        ("gate", "Syd", "a"),
+                    ),
+                ),
+                (
+                    "unscheduled_block",
+                    ("gate", "Entangle", qubit(0), qubit(1)),
+                    ("gate", "Px", qubit(2)),
+                    ("loop", 2, ("gate", "Entangle", qubit(1), qubit(2))),
+                ),
+            ),
+            native_gates,
+        )
+        estimate = estimate_schedule(circ)
+        self.assertEqual(estimate.gate_counts["MS"], 3)
+        self.assertEqual(estimate.gate_counts["Sy"], 3)
+        self.assertNotIn("Entangle", estimate.gate_counts)
+        self.assertEqual(estimate.moments, 10)
+        self.assertEqual(estimate.critical_path, 9)
+        scheduled = expand_macros(schedule_circuit(circ))
+        self.assertEqual(estimate_schedule(scheduled).moments, estimate.moments)
+
+    def test_nested_unscheduled(self):
+        # The scheduler leaves a block in a loop in an unscheduled block as it is.
+        circ = build(
+            (
+                "circuit",
+                ("register", "q", 2),
+                (
+                    "unscheduled_block",
+                    ("gate", "Px", qubit(0)),
+                    (
+                        "loop",
+                        2,
+                        (
+                            "unscheduled_block",
+                            ("gate", "Px", qubit(0)),
+                            ("gate", "Px", qubit(1)),
+                        ),
+                    ),
+                ),
+            ),
+            native_gates,
+        )
+        self.assertEqual(estimate_schedule(circ).moments, 5)
+        loop = schedule_circuit(circ).body.statements[0].statements[1]
+        self.assertEqual(len(loop.statements.statements), 2)
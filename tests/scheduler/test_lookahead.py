@@ -0,0 +1,77 @@
+import unittest, pytest
+import jaqalpaq
+from jaqalpaq.core.circuitbuilder import build
+from jaqalpaq.error import JaqalError
+from jaqalpaq.scheduler import ScheduleCache, schedule_circuit
+
+qscout = pytest.importorskip("qscout")
+from qscout.v1.std.jaqal_gates import ALL_GATES as native_gates
+
+
+def qubit(idx):
+    return ("array_item", "q", idx)
+
+
+class LookaheadTester(unittest.TestCase):
+    # Placing each gate as early as possible leaves the first Px in a moment of its own
+    # before the MS gate, but it can wait and share one with the second.
+    unscheduled = (
+        "circuit",
+        ("register", "q", 3),
+        (
+            "unscheduled_block",
+            ("gate", "Px", qubit(1)),
+            ("gate", "MS", qubit(0), qubit(2), 0, 0),
+            ("gate", "Px", qubit(2)),
+        ),
+    )
+
+    def moments(self, **kwargs):
+        circ = schedule_circuit(build(self.unscheduled, native_gates), **kwargs)
+        return circ.body.statements[0].statements
+
+    def test_greedy(self):
+        self.assertEqual(len(self.moments()), 3)
+
+    def test_lookahead(self):
+        scheduled = build(
+            (
+                "circuit",
+                ("register", "q", 3),
+                (
+                    "sequential_block",
+                    ("gate", "MS", qubit(0), qubit(2), 0, 0),
+                    (
+                        "parallel_block",
+                        ("gate", "Px", qubit(1)),
+                        ("gate", "Px", qubit(2)),
+                    ),
+                ),
+            ),
+            native_gates,
+        )
+        self.assertEqual(
+            schedule_circuit(
+                build(self.unscheduled, native_gates), lookahead=True
+            ).body.statements[0],
+            scheduled.body.statements[0],
+        )
+        self.assertEqual(len(self.moments(lookahead=3)), 2)
+
+    def test_never_worse(self):
+        # A window too small to see past the MS gate, or no time to look at all, keeps
+        # the usual schedule.
+        self.assertEqual(len(self.moments(lookahead=1)), 3)
+        self.assertEqual(len(self.moments(lookahead=True, time_budget=-1)), 3)
+
+    def test_shared_cache(self):
+        # Plans made with and without looking ahead mustn't be replayed for each other.
+        for options in ({}, {"lookahead": True}), ({"lookahead": True}, {}):
+            cache = ScheduleCache()
+            for kwargs in options * 2:
+                expected = 2 if kwargs else 3
+                self.assertEqual(len(self.moments(cache=cache, **kwargs)), expected)
+
+    def test_bad_window(self):
+        with self.assertRaises(JaqalError):
+            self.moments(lookahead=0)
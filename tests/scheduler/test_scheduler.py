@@ -1,7 +1,9 @@
 import unittest, pytest
 import jaqalpaq
 from jaqalpaq.core.circuitbuilder import build
-from jaqalpaq.scheduler import schedule_circuit
+from jaqalpaq.error import JaqalError
+from jaqalpaq.scheduler import schedule_circuit, schedule_circuits
+from jaqalpaq.scheduler.scheduler import SchedulerContext
 
 qscout = pytest.importorskip("qscout")
 from qscout.v1.std.jaqal_gates import ALL_GATES as native_gates
@@ -228,11 +230,96 @@ class SchedulerTester(unittest.TestCase):
             ("gate", "measure_all"),
         ),
     )
+    scheduled_circuit_5 = (
+        "circuit",
+        ("register", "q", 4),
+        (
+            "macro",
+            "Flip",
+            "a",
+            ("sequential_block", ("gate", "Px", "a")),
+        ),
+        (
+            "macro",
+            "Twice",
+            "a",
+            ("sequential_block", ("gate", "Px", "a"), ("gate", "Px", "a")),
+        ),
+        (
+            "macro",
+            "Entangle",
+            "a",
+            "b",
+            (
+                "sequential_block",
+                ("parallel_block", ("gate", "Sy", "a"), ("gate", "Sy", "b")),
+                ("gate", "MS", "a", "b", 0, 1.5),
+                ("parallel_block", ("gate", "Sx", "a"), ("gate", "Sx", "b")),
+            ),
+        ),
+        (
+            "sequential_block",
+            (
+                "parallel_block",
+                ("gate", "Sy", ("array_item", "q", 0)),
+                ("gate", "Sy", ("array_item", "q", 1)),
+                ("gate", "Flip", ("array_item", "q", 2)),
+            ),
+            ("gate", "MS", ("array_item", "q", 0), ("array_item", "q", 1), 0, 1.5),
+            (
+                "parallel_block",
+                ("gate", "Sx", ("array_item", "q", 0)),
+                ("gate", "Sx", ("array_item", "q", 1)),
+                ("gate", "Sy", ("array_item", "q", 2)),
+            ),
+            ("gate", "Twice", ("array_item", "q", 3)),
+        ),
+    )
+    unscheduled_circuit_5 = (
+        "circuit",
+        ("register", "q", 4),
+        (
+            "macro",
+            "Flip",
+            "a",
+            ("sequential_block", ("gate", "Px", "a")),
+        ),
+        (
+            "macro",
+            "Twice",
+            "a",
+            ("sequential_block", ("gate", "Px", "a"), ("gate", "Px", "a")),
+        ),
+        (
+            "macro",
+            "Entangle",
+            "a",
+            "b",
+            (
+                "sequential_block",
+                (
+                    "unscheduled_block",
+                    ("gate", "Sy", "a"),
+                    ("gate", "Sy", "b"),
+                    ("gate", "MS", "a", "b", 0, 1.5),
+                    ("gate", "Sx", "a"),
+                    ("gate", "Sx", "b"),
+                ),
+            ),
+        ),
+        (
+            "unscheduled_block",
+            ("gate", "Entangle", ("array_item", "q", 0), ("array_item", "q", 1)),
+            ("gate", "Flip", ("array_item", "q", 2)),
+            ("gate", "Sy", ("array_item", "q", 2)),
+            ("gate", "Twice", ("array_item", "q", 3)),
+        ),
+    )
 
-    def run_test(self, unscheduled, scheduled):
+    def run_test(self, unscheduled, scheduled, **kwargs):
         self.assertEqual(
             build(scheduled, native_gates),
-            schedule_circuit(build(unscheduled, native_gates)),
+            schedule_circuit(build(unscheduled, native_gates), **kwargs),
         )
 
     def test_identity_reschedule(self):
@@ -262,3 +349,125 @@ class SchedulerTester(unittest.TestCase):
 
     def test_reschedule_barrier(self):
         self.run_test(self.unscheduled_circuit_1, self.scheduled_circuit_1)
+
+    def test_reschedule_workers(self):
+        self.run_test(self.unscheduled_circuit_0a, self.scheduled_circuit_0, workers=2)
+        self.run_test(self.unscheduled_circuit_0b, self.scheduled_circuit_0, workers=2)
+        self.run_test(self.unscheduled_circuit_1, self.scheduled_circuit_1, workers=2)
+        self.run_test(self.unscheduled_circuit_2, self.scheduled_circuit_2, workers=2)
+        self.run_test(self.unscheduled_circuit_3, self.scheduled_circuit_3, workers=2)
+        self.run_test(self.unscheduled_circuit_4, self.scheduled_circuit_4, workers=2)
+
+    def test_reschedule_batch(self):
+        pairs = [
+            (self.unscheduled_circuit_0a, self.scheduled_circuit_0),
+            (self.unscheduled_circuit_1, self.scheduled_circuit_1),
+            (self.unscheduled_circuit_2, self.scheduled_circuit_2),
+            (self.scheduled_circuit_4, self.scheduled_circuit_4),
+            (self.unscheduled_circuit_3, self.scheduled_circuit_3),
+            (self.unscheduled_circuit_4, self.scheduled_circuit_4),
+        ]
+        unscheduled = [build(pair[0], native_gates) for pair in pairs]
+        scheduled = [build(pair[1], native_gates) for pair in pairs]
+        self.assertEqual(scheduled, schedule_circuits(unscheduled))
+        self.assertEqual(
+            scheduled, schedule_circuits(unscheduled, workers=2, chunksize=2)
+        )
+        self.assertEqual(
+            scheduled,
+            schedule_circuits(unscheduled, workers=2, executor="process", chunksize=2),
+        )
+        with self.assertRaises(JaqalError):
+            schedule_circuits(unscheduled, workers=2, executor="fiber")
+
+    def test_reschedule_macros(self):
+        self.run_test(self.scheduled_circuit_4, self.scheduled_circuit_4, macros=True)
+        self.run_test(self.unscheduled_circuit_4, self.scheduled_circuit_4, macros=True)
+        self.run_test(self.unscheduled_circuit_5, self.scheduled_circuit_5, macros=True)
+        self.run_test(
+            self.unscheduled_circuit_5, self.scheduled_circuit_5, macros=True, workers=2
+        )
+
+    def test_share_unchanged(self):
+        q = [("array_item", "q", idx) for idx in range(3)]
+        prepared = (
+            "sequential_block",
+            ("gate", "prepare_all"),
+            ("parallel_block", ("gate", "Px", q[0]), ("gate", "Py", q[1])),
+        )
+        measured = ("loop", 2, ("sequential_block", ("gate", "measure_all")))
+        unscheduled = build(
+            (
+                "circuit",
+                ("register", "q", 3),
+                prepared,
+                (
+                    "loop",
+                    2,
+                    (
+                        "sequential_block",
+                        ("sequential_block", ("gate", "Px", q[0])),
+                        ("gate", "Py", q[2]),
+                    ),
+                ),
+                ("unscheduled_block", ("gate", "Px", q[0]), ("gate", "Py", q[1])),
+                measured,
+            ),
+            native_gates,
+        )
+        scheduled = build(
+            (
+                "circuit",
+                ("register", "q", 3),
+                prepared,
+                (
+                    "loop",
+                    2,
+                    ("sequential_block", ("gate", "Px", q[0]), ("gate", "Py", q[2])),
+                ),
+                (
+                    "sequential_block",
+                    ("parallel_block", ("gate", "Px", q[0]), ("gate", "Py", q[1])),
+                ),
+                measured,
+            ),
+            native_gates,
+        )
+        result = schedule_circuit(unscheduled)
+        self.assertEqual(scheduled, result)
+        # Subtrees with nothing to schedule or flatten are shared, not copied.
+        self.assertIs(result.body.statements[0], unscheduled.body.statements[0])
+        self.assertIsNot(result.body.statements[1], unscheduled.body.statements[1])
+        self.assertIs(result.body.statements[3], unscheduled.body.statements[3])
+
+    def test_flat_plan(self):
+        # Blocks of nothing but gates take a faster path that must place them the same
+        # way as any other block.
+        q = [("array_item", "q", idx) for idx in range(4)]
+        circ = build(
+            (
+                "circuit",
+                ("register", "q", 4),
+                (
+                    "unscheduled_block",
+                    ("gate", "prepare_all"),
+                    ("gate", "Px", q[0]),
+                    ("gate", "MS", q[1], q[2], 0, 1.5),
+                    ("gate", "Py", q[3]),
+                    ("gate", "Sx", q[1]),
+                    ("gate", "MS", q[0], q[3], 0, 1.5),
+                    ("gate", "Sy", q[2]),
+                    ("gate", "Px", q[0]),
+                    ("gate", "measure_all"),
+                ),
+            ),
+            native_gates,
+        )
+        block = circ.body.statements[0]
+        context = SchedulerContext(circ.fundamental_registers(), native_gates)
+        self.assertTrue(context.is_flat(block))
+        with_loop = build(self.unscheduled_circuit_3, native_gates).body.statements[0]
+        self.assertFalse(context.is_flat(with_loop))
+        plan = context.flat_plan(block)
+        self.assertEqual(plan, context.schedule_moments(block).plan())
+        self.assertEqual(plan, [[0], [1, 3], [2], [4, 6], [5], [7], [8]])
@@ -0,0 +1,58 @@
+import unittest, pytest
+import jaqalpaq
+from jaqalpaq.core.circuitbuilder import build
+from jaqalpaq.scheduler import schedule_circuit, schedule_circuits, SchedulerStats
+
+qscout = pytest.importorskip("qscout")
+from qscout.v1.std.jaqal_gates import ALL_GATES as native_gates
+
+
+def qubit(idx):
+    return ("array_item", "q", idx)
+
+
+class StatsTester(unittest.TestCase):
+    def setUp(self):
+        self.circuit = build(
+            (
+                "circuit",
+                ("register", "q", 3),
+                ("gate", "prepare_all"),
+                (
+                    "unscheduled_block",
+                    ("gate", "Px", qubit(0)),
+                    ("gate", "Px", qubit(1)),
+                    ("gate", "MS", qubit(0), qubit(1), 0, 0),
+                    ("gate", "Py", qubit(2)),
+                    ("loop", 2, ("sequential_block", ("gate", "Pz", qubit(2)))),
+                ),
+                ("gate", "measure_all"),
+            ),
+            native_gates,
+        )
+
+    def test_counts(self):
+        stats = SchedulerStats()
+        schedule_circuit(self.circuit, stats=stats)
+        self.assertEqual(stats.blocks, 1)
+        self.assertEqual(stats.gates, 5)
+        # Px and Py share the first moment, then MS, then the loop.
+        self.assertEqual(stats.moments, 3)
+        self.assertAlmostEqual(stats.parallelism, 5 / 3)
+        # Px on q1 and Py are each checked against the first moment.
+        self.assertEqual(stats.conflict_checks, 2)
+        self.assertEqual(stats.longest_scan, 0)
+        self.assertGreater(stats.footprint_time, 0)
+        self.assertGreater(stats.placement_time, 0)
+        self.assertEqual(stats.as_dict()["parallelism"], stats.parallelism)
+
+    def test_accumulate(self):
+        stats = SchedulerStats()
+        schedule_circuits([self.circuit] * 3, workers=2, stats=stats)
+        self.assertEqual(stats.blocks, 3)
+        self.assertEqual(stats.gates, 15)
+        self.assertEqual(stats.moments, 9)
+        stats.clear()
+        self.assertEqual(stats.blocks, 0)
+        self.assertEqual(stats.placement_time, 0)
+        self.assertEqual(stats.parallelism, 0)
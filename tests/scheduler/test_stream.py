@@ -0,0 +1,115 @@
+import unittest, pytest
+import random
+import jaqalpaq
+from jaqalpaq.core.circuitbuilder import build
+from jaqalpaq.scheduler import schedule_circuit, schedule_stream
+
+qscout = pytest.importorskip("qscout")
+from qscout.v1.std.jaqal_gates import ALL_GATES as native_gates
+
+
+def random_gates(rng, qubits, count):
+    gates = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.05:
+            gates.append(("gate", rng.choice(["prepare_all", "measure_all"])))
+        elif roll < 0.3:
+            a, b = rng.sample(range(qubits), 2)
+            gates.append(
+                ("gate", "Sxx", ("array_item", "q", a), ("array_item", "q", b))
+            )
+        else:
+            gates.append(
+                (
+                    "gate",
+                    rng.choice(["Px", "Py", "Sx", "Sy"]),
+                    ("array_item", "q", rng.randrange(qubits)),
+                )
+            )
+    return gates
+
+
+class StreamTester(unittest.TestCase):
+    def test_matches_schedule_circuit(self):
+        rng = random.Random(1)
+        for _ in range(50):
+            qubits = rng.randrange(2, 6)
+            circ = build(
+                (
+                    "circuit",
+                    ("register", "q", qubits),
+                    ("unscheduled_block", *random_gates(rng, qubits, 40)),
+                ),
+                native_gates,
+            )
+            scheduled = schedule_circuit(circ)
+            streamed = list(
+                schedule_stream(
+                    iter(circ.body.statements[0].statements),
+                    circ.fundamental_registers(),
+                    circ.native_gates,
+                )
+            )
+            self.assertEqual(scheduled.body.statements[0].statements, streamed)
+
+    def test_emits_before_end(self):
+        circ = build(
+            (
+                "circuit",
+                ("register", "q", 2),
+                (
+                    "unscheduled_block",
+                    ("gate", "prepare_all"),
+                    ("gate", "Px", ("array_item", "q", 0)),
+                    ("gate", "Py", ("array_item", "q", 1)),
+                    ("gate", "measure_all"),
+                    ("gate", "prepare_all"),
+                ),
+            ),
+            native_gates,
+        )
+        consumed = []
+
+        def gates():
+            for gate in circ.body.statements[0].statements:
+                consumed.append(gate)
+                yield gate
+
+        stream = schedule_stream(gates(), circ.fundamental_registers(), native_gates)
+        self.assertEqual(next(stream).name, "prepare_all")
+        self.assertEqual(len(consumed), 1)
+        self.assertTrue(next(stream).parallel)
+        self.assertEqual(len(consumed), 3)
+        self.assertEqual(next(stream).name, "measure_all")
+        self.assertEqual(len(consumed), 4)
+        self.assertEqual(next(stream).name, "prepare_all")
+        self.assertEqual(list(stream), [])
+
+    def test_max_moments(self):
+        # q[1] is never used, so without a limit nothing would be final until the end.
+        circ = build(
+            (
+                "circuit",
+                ("register", "q", 2),
+                (
+                    "unscheduled_block",
+                    *[("gate", "Px", ("array_item", "q", 0)) for _ in range(20)],
+                ),
+            ),
+            native_gates,
+        )
+        consumed = []
+
+        def gates():
+            for gate in circ.body.statements[0].statements:
+                consumed.append(gate)
+                yield gate
+
+        streamed = []
+        for moment in schedule_stream(
+            gates(), circ.fundamental_registers(), native_gates, max_moments=3
+        ):
+            self.assertLessEqual(len(consumed) - len(streamed), 4)
+            streamed.append(moment)
+        self.assertEqual(streamed, circ.body.statements[0].statements)
@@ -6,11 +6,37 @@ qiskit = pytest.importorskip("qiskit")
 
 from jaqalpaq.transpilers.qiskit import (
     get_ion_instance,
+    TranspileCache,
 )
-from qiskit.circuit import QuantumCircuit, QuantumRegister, ClassicalRegister
+from jaqalpaq.transpilers.qiskit.instance import IonInstance
+from qiskit import Aer
+from qiskit.circuit import QuantumCircuit, QuantumRegister, ClassicalRegister, Parameter
+from jaqalpaq.emulator import UnitarySerializedEmulator
 from math import pi
 
 
+class CountingEmulator(UnitarySerializedEmulator):
+    """Counts how many circuits it's asked to run."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.runs = 0
+
+    def __call__(self, *args, **kwargs):
+        self.runs += 1
+        return super().__call__(*args, **kwargs)
+
+
+def rotations():
+    circuits = []
+    for idx in range(4):
+        circ = QuantumCircuit(2, name=f"circuit{idx}")
+        circ.rx(pi * idx / 4, 0)
+        circ.jaqalms(pi / 4, pi / 2, 0, 1)
+        circuits.append(circ)
+    return circuits
+
+
 class QiskitBackendTester(unittest.TestCase):
     def test_bell_pair(self):
         qr = QuantumRegister(2)
@@ -23,3 +49,103 @@ class QiskitBackendTester(unittest.TestCase):
         self.assertEqual(len(counts), 2)
         self.assertTrue("00" in counts)
         self.assertTrue("11" in counts)
+
+    def test_seed(self):
+        qr = QuantumRegister(2)
+        circ = QuantumCircuit(qr)
+        circ.jaqalms(pi / 4, pi / 2, qr[0], qr[1])
+        results = []
+        for _ in range(2):
+            instance = get_ion_instance(seed=1234)
+            instance.set_config(shots=1000)
+            results.append(instance.execute([circ]).get_counts())
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(sum(results[0].values()), 1000)
+        self.assertEqual(set(results[0]), {"00", "11"})
+
+    def test_jaqal_backend(self):
+        backend = CountingEmulator()
+        instance = get_ion_instance(jaqal_backend=backend)
+        instance.execute(rotations())
+        instance.execute(rotations()[0])
+        self.assertEqual(backend.runs, 5)
+
+    def test_workers(self):
+        serial = get_ion_instance(seed=1234)
+        expected = serial.execute(rotations())
+        for executor in ("thread", "process"):
+            instance = get_ion_instance(seed=1234, workers=2, executor=executor)
+            try:
+                result = instance.execute(rotations())
+            finally:
+                instance.close()
+            self.assertEqual(list(result.counts), [f"circuit{idx}" for idx in range(4)])
+            self.assertEqual(result.counts, expected.counts)
+
+    def test_default_backend(self):
+        instance = get_ion_instance()
+        backend = instance.jaqal_backend
+        self.assertIsNotNone(backend)
+        instance.execute(rotations())
+        self.assertIs(instance.jaqal_backend, backend)
+
+    def test_context_manager(self):
+        with get_ion_instance(workers=2) as instance:
+            instance.execute(rotations())
+            pool = instance._pool
+            self.assertIsNotNone(pool)
+        self.assertIsNone(instance._pool)
+        with self.assertRaises(RuntimeError):
+            pool.submit(int)
+
+    def test_transpile_cache(self):
+        instance = get_ion_instance(seed=1234)
+        first, second = rotations()[:2]
+        renamed = rotations()[0]
+        renamed.name = "renamed"
+        instance.execute([first, second])
+        result = instance.execute([renamed])
+        self.assertEqual(list(result.counts), ["renamed"])
+        self.assertEqual(instance.transpile(renamed)[0].name, "renamed")
+        self.assertEqual(instance.transpile_cache.misses, 2)
+        self.assertEqual(instance.transpile_cache.hits, 2)
+
+    def test_transpile_cache_limits(self):
+        circuits = rotations()
+        cache = TranspileCache(maxsize=2)
+        instance = get_ion_instance(transpile_cache=cache)
+        instance.transpile(circuits[:3])
+        self.assertEqual(len(cache), 2)
+        instance.transpile(circuits[0])
+        self.assertEqual(cache.hits, 0)
+        instance.transpile(circuits[2])
+        self.assertEqual(cache.hits, 1)
+
+        cache = TranspileCache(maxsize=None, maxbytes=1)
+        instance = get_ion_instance(transpile_cache=cache)
+        instance.transpile(circuits)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.nbytes, 0)
+
+    def test_transpile_cache_parameters(self):
+        # A new parameter with the same name is a different parameter.
+        instance = get_ion_instance()
+        for _ in range(2):
+            theta = Parameter("theta")
+            circ = QuantumCircuit(1)
+            circ.rx(theta, 0)
+            transpiled = instance.transpile(circ)[0]
+            transpiled.assign_parameters({theta: 0.5})
+        self.assertEqual(instance.transpile_cache.hits, 0)
+
+    def test_transpile_cache_settings(self):
+        # Instances sharing a cache don't share conversions made with other settings.
+        cache = TranspileCache()
+        circ = rotations()[0]
+        get_ion_instance(transpile_cache=cache).execute([circ])
+        names = {"jaqalms": "MS", "jaqalr": "R", "rz": "Rz", "sy": "Sy"}
+        instance = IonInstance(
+            Aer.get_backend("qasm_simulator"), names=names, transpile_cache=cache
+        )
+        instance.execute([circ])
+        self.assertEqual(cache.misses, 2)
@@ -0,0 +1,80 @@
+import unittest, pytest
+
+import jaqalpaq
+
+qiskit = pytest.importorskip("qiskit")
+
+import numpy as np
+from jaqalpaq.emulator import run_jaqal_circuit
+from jaqalpaq.error import JaqalError
+from jaqalpaq.transpilers.qiskit import (
+    ion_pass_manager,
+    jaqal_circuit_from_qiskit_circuit,
+    jaqal_template_from_qiskit_circuit,
+)
+from qiskit.circuit import QuantumCircuit, Parameter
+
+
+class QiskitTemplateTester(unittest.TestCase):
+    def setUp(self):
+        self.theta = Parameter("theta")
+        self.phi = Parameter("phi")
+        circ = QuantumCircuit(2)
+        circ.rx(self.theta, 0)
+        circ.cx(0, 1)
+        circ.rz(2 * self.phi + 0.5, 1)
+        circ.rz(self.theta * self.phi, 0)
+        self.circ = ion_pass_manager().run(circ)
+
+    def probabilities(self, jcircuit):
+        return run_jaqal_circuit(jcircuit).subcircuits[0].probability_by_int
+
+    def expected(self, values):
+        return self.probabilities(
+            jaqal_circuit_from_qiskit_circuit(self.circ.assign_parameters(values))
+        )
+
+    def test_unbound(self):
+        with self.assertRaises(JaqalError):
+            jaqal_circuit_from_qiskit_circuit(self.circ)
+
+    def test_bind(self):
+        template = jaqal_template_from_qiskit_circuit(self.circ)
+        self.assertEqual(template.parameters, [self.phi, self.theta])
+        self.assertEqual(set(template.circuit.constants), set(template.slots))
+        values = {self.theta: 0.7, self.phi: -0.2}
+        self.assertTrue(
+            np.allclose(
+                self.probabilities(template.bind(values)), self.expected(values)
+            )
+        )
+        angles = template.angles([[-0.2, 0.7]])[0]
+        self.assertIn(0.1, [round(angle, 12) for angle in angles.values()])
+        self.assertIn(-0.14, [round(angle, 12) for angle in angles.values()])
+
+    def test_bind_batch(self):
+        template = jaqal_template_from_qiskit_circuit(self.circ).schedule()
+        batch = [[0.1, 0.2], [1.5, -0.3], [3.0, 2.0]]
+        for values, jcircuit in zip(batch, template.bind_batch(batch)):
+            self.assertTrue(
+                np.allclose(
+                    self.probabilities(jcircuit),
+                    self.expected(dict(zip(template.parameters, values))),
+                )
+            )
+        with self.assertRaises(JaqalError):
+            template.bind([0.1])
+        with self.assertRaises(JaqalError):
+            template.bind({self.theta: 0.1})
+
+    def test_no_parameters(self):
+        circ = QuantumCircuit(1)
+        circ.rz(0.5, 0)
+        template = jaqal_template_from_qiskit_circuit(circ)
+        self.assertEqual(template.angles([[], {}]), [{}, {}])
+        self.assertEqual(len(template.bind_batch([[], []])), 2)
+        self.assertEqual(template.bind([]).constants, {})
+        with self.assertRaises(JaqalError):
+            template.bind([0.5])
+        with self.assertRaises(JaqalError):
+            template.bind({self.theta: 0.5})
@@ -76,3 +76,19 @@ class QiskitUnrollerTester(unittest.TestCase):
         c2.sydg(qr[0])
         self.maxDiff = 2000
         self.assertEqual(str(c2.draw()), str(unrolled.draw()))
+
+    def test_reuse_translation(self):
+        # The translation found for the first gate is reused, with its own parameters,
+        # for the second, even by another pass manager.
+        qr = QuantumRegister(1)
+        circ = QuantumCircuit(qr)
+        circ.u(pi, pi / 2, pi / 4, qr[0])
+        ion_pass_manager().run(circ)
+        circ = QuantumCircuit(qr)
+        circ.u(pi / 2, pi / 4, pi / 8, qr[0])
+        unrolled = ion_pass_manager().run(circ)
+        c2 = QuantumCircuit(qr)
+        c2.rz(pi / 8, qr[0])
+        c2.jaqalr(pi / 2, pi / 2, qr[0])
+        c2.rz(pi / 4, qr[0])
+        self.assertEqual(str(c2.draw()), str(unrolled.draw()))